@@ -0,0 +1,37 @@
+# Per-object memory and per-access latency of Data: updated() plus field access.
+import tracemalloc
+from timeit import timeit
+
+import numpy as np
+
+from pjdata.aux.compression import pack
+from pjdata.aux.uuid import UUID
+from pjdata.content.data import Data
+from pjdata.history import History
+
+X = np.random.random((100, 4))
+Y = np.random.randint(0, 2, (100, 1))
+matrices = {"X": X, "Y": Y, "Xd": ["a", "b", "c", "d"], "Yd": ["class"], "Xt": 4 * ["real"], "Yt": [[0, 1]]}
+data = Data(
+    uuid=UUID(), uuids={k: UUID(pack(v)) for k, v in matrices.items()},
+    failure=None, frozen=False, history=History([]), hollow=False, stream=None, **matrices
+)
+
+
+def updated():
+    data.updated([], X=X)
+
+
+def access():
+    data.X, data.Y, data.y
+
+
+n = 20_000
+print("updated", f"{timeit(updated, number=n) / n * 1e6:.2f} us")
+print("access (X, Y, y)", f"{timeit(access, number=n) / n * 1e6:.2f} us")
+
+tracemalloc.start()
+datas = [data.updated([], X=X) for _ in range(n)]
+size, _ = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+print("memory per updated Data object", f"{size / n:.0f} bytes")
@@ -0,0 +1,72 @@
+# Deserialization of deep (nested) pipelines: previous recursion (import per component) vs deserialize()
+# (memoized class lookup, fresh instances) vs lazy deserialize() (no instantiation when only names are needed).
+import importlib
+import json
+import random
+from timeit import timeit
+
+from pjdata.aux.serialization import deserialize
+from pjdata.aux.uuid import UUID
+from pjdata.mixin.serialization import withSerialization
+
+
+class Step(withSerialization):
+    path = "__main__"
+    hasenhancer = hasmodel = True
+
+    def __init__(self, k, component=None):
+        self.config = {"k": k} if component is None else {"k": k, "component": component}
+        self.jsonable = {"info": {"id": f"Step@{self.path}", "config": self.config}, "enhance": True, "model": True}
+
+    def _name_impl(self):
+        return "Step"
+
+    def _uuid_impl(self):
+        return UUID(self.serialized.encode())
+
+    def _cfuuid_impl(self, data=None):
+        return UUID(self.serialized.encode())
+
+
+def legacy(dic):
+    # Previous behavior: import + getattr per component, no memoization of nested components.
+    name, path = dic["info"]["id"].split("@")
+    cfg = dic["info"]["config"]
+    if "component" in cfg:
+        cfg["component"] = legacy(cfg["component"])
+    return getattr(importlib.import_module(path), name)(**cfg)
+
+
+# Random pipelines with 40 nested steps, whose 30 innermost steps are one of a few shared sub-pipelines.
+random.seed(0)
+shared = []
+for i in range(5):
+    step = None
+    for depth in range(30):
+        step = Step(i * 100 + depth, step)
+    shared.append(step)
+texts = []
+for _ in range(200):
+    step = random.choice(shared)
+    for depth in range(10):
+        step = Step(random.randint(0, 1000), step)
+    texts.append(step.serialized)
+
+
+def previous():
+    for txt in texts:
+        legacy(json.loads(txt))
+
+
+def current():
+    for txt in texts:
+        deserialize(txt)
+
+
+def lazy():
+    for txt in texts:
+        deserialize(txt, lazy=True).name
+
+
+for f in [previous, current, lazy]:
+    print(f.__name__, f"{timeit(f, number=5) / 5 * 1000:.2f} ms")
@@ -0,0 +1,41 @@
+# Creation and access cost of 100k Info objects with lazy items: previous dynamic subclasses vs lazy slots.
+import tracemalloc
+from functools import lru_cache
+from inspect import signature
+from timeit import timeit
+
+from pjdata.transformer.info import Info
+
+
+class LegacyInfo:
+    # Previous approach: one new class per instance, one lru_cache per lazy item.
+    # (It passed 'self' to the zero-arity functions; they are wrapped here so that access can be measured.)
+    def __init__(self, items):
+        lazies = {k: v for k, v in items.items() if callable(v) and not signature(v).parameters}
+        _ = [items.pop(k) for k in lazies]
+        lazy_props = {k: property(lru_cache(lambda _, f=f: f())) for k, f in lazies.items()}
+        self.__class__ = type(LegacyInfo.__name__, (LegacyInfo,), lazy_props)
+        self.__dict__.update(items)
+
+
+n = 100_000
+
+
+def items():
+    return {"model": None, "score": 0.5, "predictions": lambda: [1, 2, 3], "inner": lambda: "expensive"}
+
+
+for klass in [LegacyInfo, Info]:
+    infos = []
+    creation = timeit(lambda: infos.append(klass(items())), number=n) / n
+    first = timeit(lambda: [info.predictions for info in infos], number=1) / n
+    later = timeit(lambda: [info.predictions for info in infos], number=1) / n
+    del infos
+    tracemalloc.start()
+    infos = [klass(items()) for _ in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        klass.__name__, f"creation {creation * 1e6:.2f} us", f"first access {first * 1e6:.2f} us",
+        f"later access {later * 1e6:.2f} us", f"memory {size / n:.0f} bytes/object"
+    )
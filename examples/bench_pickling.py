@@ -0,0 +1,42 @@
+# Compare default pickling of Data (whole __dict__, in-band) with Data.__reduce_ex__ (protocol 5, out-of-band).
+import pickle
+from timeit import timeit
+
+import numpy as np
+
+from pjdata.aux.uuid import UUID
+from pjdata.content.data import Data
+from pjdata.history import History
+
+
+X = np.random.random((500_000, 80))  # ~320MB
+Y = np.random.randint(0, 2, (500_000, 1)).astype(float)
+data = Data(
+    uuid=UUID(), uuids={"X": UUID(), "Y": UUID()},
+    failure=None, frozen=False, history=History([]), hollow=False, stream=None,
+    X=X, Y=Y, Xd=[f"a{i}" for i in range(80)], Yd=["class"], Xt=80 * ["real"], Yt=[[0.0, 1.0]]
+)
+data.X, data.y  # Fill caches, as in a real pipeline.
+print(f"{(X.nbytes + Y.nbytes) / 1e6:.0f} MB")
+
+
+def legacy():
+    # Default pickling of an object is equivalent to pickling its whole state: slots (matrices, history, ...)
+    # and __dict__ (cached values).
+    state = {name: getattr(data, name) for name in Data.__slots__}
+    state.update(data.__dict__)
+    pickle.loads(pickle.dumps(state, protocol=4))
+
+
+def inband():
+    pickle.loads(pickle.dumps(data, protocol=5))
+
+
+def outofband():
+    buffers = []
+    dump = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    pickle.loads(dump, buffers=buffers)
+
+
+for f in [legacy, inband, outofband]:
+    print(f.__name__, f"{timeit(f, number=5) / 5 * 1000:.1f} ms")
@@ -0,0 +1,56 @@
+# SQLiteStorage: batched writes/reads of 100k small Data rows, and a few large matrices.
+import os
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from pjdata.aux.compression import pack
+from pjdata.aux.uuid import UUID
+from pjdata.content.data import Data
+from pjdata.history import History
+from pjdata.storage.sqlite import SQLiteStorage
+
+shared = {"Xd": ["a", "b", "c"], "Yd": ["class"], "Xt": 3 * ["real"], "Yt": [[0, 1]]}
+shared_uuids = {k: UUID(pack(v)) for k, v in shared.items()}
+
+
+def small(i):
+    X, Y = np.full((1, 3), i, dtype=float), np.array([[i % 2]])
+    uuids = {"X": UUID(f"X{i}".encode()), "Y": UUID(f"Y{i % 2}".encode()), **shared_uuids}
+    return Data(
+        uuid=UUID(f"data{i}".encode()), uuids=uuids, failure=None, frozen=False, history=History([]), hollow=False,
+        stream=None, X=X, Y=Y, **shared
+    )
+
+
+def timed(label, f, n=1):
+    start = perf_counter()
+    ret = f()
+    elapsed = perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:9.1f} ms" + (f"  ({elapsed / n * 1e6:.1f} us/row)" if n > 1 else ""))
+    return ret
+
+
+n = 100_000
+datas = [small(i) for i in range(n)]
+ids = [d.uuid.id for d in datas]
+with tempfile.TemporaryDirectory() as tmp:
+    storage = SQLiteStorage(os.path.join(tmp, "one.db"))
+    timed("store() one by one (first 10k)", lambda: [storage.store(d) for d in datas[:10_000]], 10_000)
+
+    storage = SQLiteStorage(os.path.join(tmp, "bench.db"))
+    timed("store_many() 100k", lambda: storage.store_many(datas), n)
+    timed("store_many() 100k again (all present)", lambda: storage.store_many(datas), n)
+    timed("hasdata() one by one (first 10k)", lambda: [storage.hasdata(id) for id in ids[:10_000]], 10_000)
+    fetched = timed("fetch_many() 100k (batched)", lambda: storage.fetch_many(ids, lazy=False), n)
+    assert len(fetched) == n and (fetched[ids[-1]].X == datas[-1].X).all()
+    timed("fetch_many() 100k lazy (metadata only)", lambda: storage.fetch_many(ids, lazy=True), n)
+
+    large = [np.random.random((2000, 2000)) for _ in range(4)]
+    matrices = {UUID(f"large{i}".encode()).id: m for i, m in enumerate(large)}
+    timed(f"store_matrices() 4 x {large[0].nbytes // 2 ** 20}MiB", lambda: storage.store_matrices(matrices))
+    fetched = timed(f"fetch_matrices() 4 x {large[0].nbytes // 2 ** 20}MiB", lambda: storage.fetch_matrices(matrices))
+    assert all((fetched[id] == m).all() for id, m in matrices.items())
+    print("database size", f"{os.path.getsize(os.path.join(tmp, 'bench.db')) / 2 ** 20:.1f} MiB")
+    storage.close()
@@ -0,0 +1,30 @@
+import numpy as np
+
+from pjdata.aux.compression import pack
+from pjdata.aux.uuid import UUID
+from pjdata.content.data import Data
+from pjdata.history import History
+from pjdata.ranking import rank, top_k
+
+
+def result(i, s):
+    matrices = {"X": np.array([[i, i]]), "Xd": ["a", "b"], "Xt": ["real", "real"], "S": np.array([[s]])}
+    uuids = {k: UUID(pack(v)) for k, v in matrices.items()}
+    return Data(
+        uuid=UUID(f"result{i}".encode()), uuids=uuids, failure=None, frozen=False, history=History([]), hollow=False,
+        stream=None, **matrices
+    )
+
+
+# Fewer than k numeric results: all of them come first, NaNs complete the k best.
+datas = [result(i, s) for i, s in enumerate([3, np.nan, np.nan, 1])]
+print([d.S[0, 0] for d in top_k(datas, 3)])
+assert top_k(datas, 3) == rank(datas)[:3] == [datas[0], datas[3], datas[1]]
+
+# top_k() agrees with rank(), ties and NaNs included.
+rng = np.random.default_rng(0)
+for trial in range(200):
+    datas = [result(trial * 10 + i, s) for i, s in enumerate(rng.choice([1.0, 2.0, np.nan], rng.integers(1, 9)))]
+    for k in range(len(datas) + 2):
+        assert [id(d) for d in top_k(datas, k)] == [id(d) for d in rank(datas)[:k]]
+print("OK")
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import numpy as np
+
+from pjdata.aux import sharedmemory
+from pjdata.aux.compression import pack
+from pjdata.aux.uuid import UUID
+from pjdata.content.data import Data
+from pjdata.history import History
+from pjdata.storage.disk import DiskStorage
+from pjdata.storage.memory import MemoryStorage
+from pjdata.storage.sqlite import SQLiteStorage
+
+matrices = {"X": np.random.random((5, 3)), "Y": np.array([[0], [1], [0], [1], [1]]), "Xd": ["a", "b", "c"],
+            "Yd": ["class"], "Xt": 3 * ["real"], "Yt": [[0, 1]]}
+uuids = {k: UUID(pack(v)) for k, v in matrices.items()}
+data = Data(
+    uuid=UUID(b"toy_storage"), uuids=uuids, failure=None, frozen=False, history=History([]), hollow=False,
+    stream=None, **matrices
+)
+
+# Matrices in shared memory are stored as plain matrices, still available after their blocks are freed.
+with tempfile.TemporaryDirectory() as tmp:
+    storages = [DiskStorage(os.path.join(tmp, "disk")), DiskStorage(os.path.join(tmp, "mmap"), mmap=True),
+                SQLiteStorage(os.path.join(tmp, "toy.db")), MemoryStorage()]
+    shared = data.shared()
+    assert isinstance(shared.matrices["X"], sharedmemory.SharedMatrix)
+    for storage in storages:
+        storage.store(shared)
+    for name in ["X", "Y"]:
+        sharedmemory.release(data.uuids[name])
+    assert not sharedmemory.exported()
+    for storage in storages:
+        fetched = storage.fetch(data) if isinstance(storage, MemoryStorage) else storage.fetch(data, lazy=False)
+        for name in ["X", "Y"]:
+            m = fetched.field(name)
+            assert isinstance(m, np.ndarray) and (m == matrices[name]).all(), (storage, name)
+            if hasattr(storage, "fetch_matrix"):
+                assert not isinstance(storage.fetch_matrix(data.uuids[name].id), sharedmemory.SharedMatrix)
+        print("OK", type(storage).__name__)
+    storages[2].close()
@@ -0,0 +1,221 @@
+"""Caches keyed by UUID ids, e.g. of fitted models or transformation results (see CACHE_CONFIG in pjdata.config).
+
+Values are anything pickable. Tiers can be combined: TieredCache(MemoryCache(), DiskCache(path)).
+"""
+from __future__ import annotations
+
+import os
+import pickle
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Literal, Optional, Union
+
+from pjdata.aux.uuid import UUID
+from pjdata.config import threadLock
+
+
+class Cache(ABC):
+    """Base class: get() returns None when the key is absent, stats() reports hits/misses."""
+
+    def __init__(self):
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get_impl(key)
+        with threadLock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        self._set_impl(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / requests if requests else 0.0}
+
+    @abstractmethod
+    def _get_impl(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def _set_impl(self, key: str, value: Any):
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process cache keeping up to 'maxsize' values by reference.
+
+    Parameters
+    ----------
+    maxsize
+        Maximum number of kept values.
+    policy
+        Which value is discarded when the cache is full:
+        'lru' least recently used, 'lfu' least frequently used (oldest among ties), 'fifo' oldest.
+    """
+
+    def __init__(self, maxsize: int = 1000, policy: Literal["lru", "lfu", "fifo"] = "lru"):
+        super().__init__()
+        if policy not in ["lru", "lfu", "fifo"]:
+            raise Exception(f"Unknown eviction policy: {policy}. Options: lru, lfu, fifo.")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.evictions = 0
+        self._values: OrderedDict = OrderedDict()
+        self._uses: Dict[str, int] = {}
+
+    def _get_impl(self, key):
+        with threadLock:
+            value = self._values.get(key)
+            if value is not None:
+                if self.policy == "lru":
+                    self._values.move_to_end(key)
+                elif self.policy == "lfu":
+                    self._uses[key] += 1
+            return value
+
+    def _set_impl(self, key, value):
+        with threadLock:
+            if key not in self._values:
+                while len(self._values) >= self.maxsize and self._values:
+                    self._evict()
+                self._uses[key] = 0
+            elif self.policy == "lru":
+                self._values.move_to_end(key)
+            self._values[key] = value
+
+    def _evict(self):
+        if self.policy == "lfu":
+            key = min(self._values, key=self._uses.__getitem__)  # Insertion order breaks ties.
+            del self._values[key]
+        else:
+            key, _ = self._values.popitem(last=False)
+        del self._uses[key]
+        self.evictions += 1
+
+    def stats(self):
+        return {**super().stats(), "size": len(self._values), "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._values)
+
+
+class DiskCache(Cache):
+    """Content-addressed directory of pickled values: <path>/<2 last hex digits>/<hex of the uuid>.pkl
+
+    Writes are atomic (temporary file + rename), so concurrent processes can share the same directory.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.failures = 0
+
+    def _get_impl(self, key):
+        try:
+            with open(self._file(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _set_impl(self, key, value):
+        try:
+            dump = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # E.g. lambdas; the value is simply not persisted.
+            with threadLock:
+                self.failures += 1
+            return
+        write_atomically(self._file(key), dump)
+
+    def _file(self, key: str) -> str:
+        name = filename(key)
+        return os.path.join(self.path, name[-2:], name + ".pkl")
+
+    def stats(self):
+        return {**super().stats(), "failures": self.failures}
+
+
+class TieredCache(Cache):
+    """Chain of caches, from the fastest. Hits in a slower tier are copied to the faster ones."""
+
+    def __init__(self, *tiers: Cache):
+        super().__init__()
+        self.tiers = tiers
+
+    def _get_impl(self, key):
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:i]:
+                    faster.set(key, value)
+                return value
+        return None
+
+    def _set_impl(self, key, value):
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def stats(self):
+        return {**super().stats(), "tiers": [tier.stats() for tier in self.tiers]}
+
+
+class StorageCache(Cache):
+    """Adapter to use a storage (see pjdata.resume) as a cache of Data objects, keyed by Data uuid.
+
+    Parameters
+    ----------
+    storage
+        Storage object or its name in STORAGE_CONFIG["storages"] (resolved at each access).
+    """
+
+    def __init__(self, storage: Union[str, Any]):
+        super().__init__()
+        self.storage = storage
+
+    def _get_impl(self, key):
+        from pjdata.content.specialdata import UUIDData
+
+        storage = self._resolve()
+        return storage.fetch(UUIDData(key)) if storage.hasdata(key) else None
+
+    def _set_impl(self, key, value):
+        self._resolve().store(value)
+
+    def _resolve(self):
+        if isinstance(self.storage, str):
+            from pjdata.storage.storage import get_storage
+
+            return get_storage(self.storage)
+        return self.storage
+
+
+def filename(id: str) -> str:
+    """File system friendly (fixed-size hexadecimal) version of a UUID id. Its last digits are the most uniform."""
+    return f"{UUID(id).n:034x}"
+
+
+def write_atomically(file: str, content: Union[bytes, Iterable[bytes], Callable[[BinaryIO], Any]]):
+    """Write to a temporary file in the same directory and rename it, i.e. readers never see partial content.
+
+    The content can be given in parts (e.g. by compression.iterpack), which are written one at a time,
+    or as a function that writes to the open file (e.g. lambda f: np.save(f, m))."""
+    directory = os.path.dirname(file)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                f.write(content)
+            elif callable(content):
+                content(f)
+            else:
+                for part in content:
+                    f.write(part)
+        os.replace(tmp, file)
+    except BaseException:
+        os.unlink(tmp)
+        raise
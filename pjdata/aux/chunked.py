@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+from functools import reduce
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np  # type: ignore
+from numpy import ndarray
+
+from pjdata.aux.uuid import UUID
+
+Chunk = Union[ndarray, str, Callable[[], ndarray]]
+
+
+class ChunkedMatrix:
+    """Out-of-core matrix given as a sequence of row blocks (chunks), for datasets larger than RAM.
+
+    Each chunk can be:
+        a numpy array;
+        a path to a '.npy' file, which will be memory-mapped (read-only);
+        a zero-arity function returning a numpy array (e.g. fetching from a Storage), called when needed.
+    Chunks are materialized only one at a time while iterating.
+
+    The UUID of the matrix is the product of the UUIDs of its chunks, in order; it is the field UUID
+    when the matrix is born (see linalghelper.matrix_uuid).
+    A single-chunk matrix has the same UUID of the chunk as a plain matrix, i.e. UUID(pack(chunk)).
+
+    Parameters
+    ----------
+    chunks
+        Row blocks, all with the same number of columns.
+    uuids
+        Optional precalculated UUIDs of the chunks (e.g. known from storage),
+        avoiding reading the content just to identify it.
+    shapes
+        Optional shapes of the chunks. Shapes of arrays and files are recorded when the chunks are added;
+        those of functions are recorded when first called.
+    """
+
+    def __init__(self, chunks: Sequence[Chunk], uuids: Sequence[UUID] = None, shapes: Sequence[Tuple[int, ...]] = None):
+        if not chunks:
+            raise Exception("A ChunkedMatrix needs at least one chunk!")
+        if uuids is not None and len(uuids) != len(chunks):
+            raise Exception(f"Expecting {len(chunks)} chunk UUIDs! Not {len(uuids)}!")
+        if shapes is not None and len(shapes) != len(chunks):
+            raise Exception(f"Expecting {len(chunks)} chunk shapes! Not {len(shapes)}!")
+        self.chunks = list(chunks)
+        self._uuids = None if uuids is None else list(uuids)
+        self._uuid = None
+        self._shapes: List[Optional[Tuple[int, ...]]] = (
+            [None if callable(c) else self._load(c).shape for c in self.chunks] if shapes is None
+            else [tuple(shape) for shape in shapes]
+        )
+
+    @property
+    def nchunks(self) -> int:
+        return len(self.chunks)
+
+    def chunk(self, i: int) -> ndarray:
+        """Materialize (or memory-map) the i-th row block."""
+        chunk = self._load(self.chunks[i])
+        if self._shapes[i] is None:
+            self._shapes[i] = chunk.shape
+        return chunk
+
+    @staticmethod
+    def _load(chunk: Chunk) -> ndarray:
+        if isinstance(chunk, str):
+            return np.load(chunk, mmap_mode="r")
+        if callable(chunk):
+            return chunk()
+        return chunk
+
+    def __iter__(self) -> Iterator[ndarray]:
+        for i in range(len(self.chunks)):
+            yield self.chunk(i)
+
+    @property
+    def shapes(self) -> List[Tuple[int, ...]]:
+        """Shape of each chunk. Only functions whose shape is still unknown are called."""
+        for i, shape in enumerate(self._shapes):
+            if shape is None:
+                self.chunk(i)
+        return self._shapes
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        shapes = self.shapes
+        return (sum(s[0] for s in shapes),) + shapes[0][1:]
+
+    @property
+    def uuids(self) -> List[UUID]:
+        """UUID of each chunk, calculated as for any other matrix (see creation.py)."""
+        if self._uuids is None:
+            from pjdata.aux.compression import pack
+
+            self._uuids = [UUID(pack(np.ascontiguousarray(chunk))) for chunk in self]
+        return self._uuids
+
+    @property
+    def uuid(self) -> UUID:
+        if self._uuid is None:
+            self._uuid = reduce(lambda a, b: a * b, self.uuids)
+        return self._uuid
+
+    def concatenate(self) -> ndarray:
+        """Materialize the entire matrix in memory (not cached)."""
+        return np.concatenate(list(self))
+
+    def __array__(self, dtype=None, copy=None):
+        m = self.concatenate()
+        return m if dtype is None else m.astype(dtype)
+
+    def __getitem__(self, rows: Union[slice, Sequence[int], ndarray]) -> ndarray:
+        """Read only the rows of interest, visiting only the chunks that contain them."""
+        nrows = self.shape[0]
+        if isinstance(rows, slice):
+            rows = np.arange(nrows)[rows]
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and (rows.min() < -nrows or rows.max() >= nrows):
+            raise IndexError(f"Row index out of range for {nrows} rows.")
+        rows = np.where(rows < 0, rows + nrows, rows)
+        bounds = np.cumsum([0] + [s[0] for s in self.shapes])
+        which = np.searchsorted(bounds, rows, side="right") - 1
+        parts, order = [], []
+        for i in np.unique(which):
+            mask = which == i
+            parts.append(self.chunk(int(i))[rows[mask] - bounds[i]])
+            order.append(np.flatnonzero(mask))
+        if not parts:
+            return np.empty((0,) + self.shape[1:])
+        result = np.concatenate(parts)
+        return result[np.argsort(np.concatenate(order), kind="stable")]
+
+    def __reduce__(self):
+        # Paths and arrays are kept as they are, deferred chunks are materialized.
+        chunks = [c if isinstance(c, (str, ndarray)) else self.chunk(i) for i, c in enumerate(self.chunks)]
+        return ChunkedMatrix, (chunks, self._uuids, self._shapes)
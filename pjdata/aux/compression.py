@@ -1,14 +1,17 @@
 import _pickle as pickle
 import json
+from functools import lru_cache, partial
+from typing import Iterator
 
 import lz4.frame as lz
 import numpy as np
 import zstandard as zs
-from functools import lru_cache
 
 # TODO: make a permanent representative dictionary and check if it
 #  reduces compression time and size of textual info like transformations.
+from pjdata.aux.chunked import ChunkedMatrix
 from pjdata.aux.encoders import integers2bytes, bytes2integers
+from pjdata.aux.uuid import UUID
 
 # Things that should be calculated only once.
 # ##################################################
@@ -685,11 +688,32 @@ cctxdic = zs.ZstdCompressor(threads=-1, dict_data=compression_dict(), write_dict
 cctxdec = zs.ZstdDecompressor()
 cctxdicdec = zs.ZstdDecompressor(dict_data=compression_dict())
 
+_UUID_SIZE = 17  # Bytes of UUID.n in the header of chunks ('C' format), enough for its upper limit.
+
 
 # ##################################################
 
 
+def iterpack(obj) -> Iterator[bytes]:
+    """Pack in parts, to be written one at a time (e.g. to a file), see pack().
+
+    A ChunkedMatrix is packed chunk by chunk, so only one chunk is in memory at a time:
+        b"C" + <number of chunks> + [<dump size> <ndim> <shape...> <chunk UUID> <dump of the chunk>]*
+    Chunk UUIDs are kept in the headers, so unpacking does not need to read (and hash) the dumps."""
+    if not isinstance(obj, ChunkedMatrix):
+        yield pack(obj)
+        return
+    yield b"C" + integers2bytes([obj.nchunks])
+    for i, chunk in enumerate(obj):
+        dump = pack(np.ascontiguousarray(chunk))
+        uuid = UUID(dump) if obj._uuids is None else obj._uuids[i]
+        yield integers2bytes([len(dump), chunk.ndim, *chunk.shape]) + uuid.n.to_bytes(_UUID_SIZE, "big")
+        yield dump
+
+
 def pack(obj):
+    if isinstance(obj, ChunkedMatrix):
+        return b"".join(iterpack(obj))
     with safety():
         if isinstance(obj, np.ndarray) and str(obj.dtype) == "float64" and len(obj.shape) == 2:
             h, w = obj.shape
@@ -708,6 +732,23 @@ def pack(obj):
 
 
 def unpack(dump_with_header):
+    """Inverse of pack().
+
+    A ChunkedMatrix is given back with deferred chunks: each one is decompressed only when accessed.
+    For out-of-core access, the dump can be a memoryview of a memory-mapped file (only headers are read here)."""
+    if dump_with_header[:1] == b"C":
+        view = memoryview(dump_with_header)
+        [n] = bytes2integers(view[1:5])
+        chunks, uuids, shapes, start = [], [], [], 5
+        for _ in range(n):
+            size, ndim = bytes2integers(view[start:start + 8])
+            shapes.append(tuple(bytes2integers(view[start + 8:start + 8 + 4 * ndim])))
+            start += 8 + 4 * ndim
+            uuids.append(UUID(int.from_bytes(view[start:start + _UUID_SIZE], "big")))  # UUID(pack(chunk)).
+            start += _UUID_SIZE
+            chunks.append(partial(unpack, view[start:start + size]))
+            start += size
+        return ChunkedMatrix(chunks, uuids, shapes)
     with safety():
         header = dump_with_header[:1]
         dump = dump_with_header[1:]
@@ -721,7 +762,7 @@ def unpack(dump_with_header):
             dump = dump_with_header[9:]
             decompressed = lz.decompress(cctxdec.decompress(dump))
             [h, w] = bytes2integers(header)
-            return np.reshape(np.frombuffer(decompressed), newshape=(h, w))
+            return np.frombuffer(decompressed).reshape(h, w)
         elif header == b"J":
             return json.loads(cctxdec.decompress(dump).decode())
         else:
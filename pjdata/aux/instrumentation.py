@@ -0,0 +1,168 @@
+"""Per-transformer timing/memory instrumentation of Data.transformedby() and Transformer.transform().
+
+Disabled by default (the hooks only check whether 'recorder' is None). Usage:
+    recorder = instrumentation.enable()
+    ...run pipelines...
+    recorder.stats()  # Aggregate per transformer.
+    recorder.chrome_trace("trace.json")  # Open in chrome://tracing or https://ui.perfetto.dev
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np  # type: ignore
+
+
+class Event(NamedTuple):
+    kind: str  # 'transformedby' or 'transform'
+    name: str  # Transformer longname.
+    start: int  # perf_counter_ns
+    wall: int  # ns
+    cpu: int  # ns (thread time)
+    tid: int
+    input_bytes: int
+    output_bytes: int
+    allocated: Optional[int]  # Net allocated bytes (only with tracemalloc).
+    cache: Optional[str]  # 'hit', 'miss' or None (no result cache).
+    failed: bool
+
+
+class Recorder:
+    """Ring buffer with the last 'size' events.
+
+    Parameters
+    ----------
+    size
+        Maximum number of kept events; the oldest ones are discarded first.
+    memory
+        Whether to measure allocations through tracemalloc (which slows down Python considerably).
+    """
+
+    def __init__(self, size: int = 100_000, memory: bool = False):
+        self.events: deque = deque(maxlen=size)
+        self.memory = memory
+        self.origin = time.perf_counter_ns()
+        self._local = threading.local()
+
+    def measure(self, kind: str, transformer, content, f: Callable, *args) -> Any:
+        """Call f(*args) recording an event about the application of the transformer to the content."""
+        frames = self._frames()
+        frames.append({})
+        allocated = tracemalloc.get_traced_memory()[0] if self.memory else None
+        cpu, start = time.thread_time_ns(), time.perf_counter_ns()
+        output, failed = None, True
+        try:
+            output = f(*args)
+            failed = False
+            return output
+        finally:
+            wall, cpu = time.perf_counter_ns() - start, time.thread_time_ns() - cpu
+            if allocated is not None:
+                allocated = tracemalloc.get_traced_memory()[0] - allocated
+            frame = frames.pop()
+            self.events.append(Event(
+                kind, transformer.longname, start, wall, cpu, threading.get_ident(),
+                _nbytes(content), _nbytes(output), allocated, frame.get("cache"), failed
+            ))
+
+    def note(self, key: str, value: Any):
+        """Annotate the innermost step being measured in this thread, e.g. note("cache", "hit")."""
+        frames = self._frames()
+        if frames:
+            frames[-1][key] = value
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Aggregate of 'transformedby' events per transformer (times in ms, sizes in bytes)."""
+        stats: Dict[str, Dict[str, float]] = {}
+        for e in self.events:
+            if e.kind != "transformedby":
+                continue
+            if e.name not in stats:
+                keys = ["count", "wall", "cpu", "input_bytes", "output_bytes", "allocated", "hits", "misses"]
+                stats[e.name] = dict.fromkeys(keys + ["failures"], 0)
+            s = stats[e.name]
+            s["count"] += 1
+            s["wall"] += e.wall / 1e6
+            s["cpu"] += e.cpu / 1e6
+            s["input_bytes"] += e.input_bytes
+            s["output_bytes"] += e.output_bytes
+            s["allocated"] += e.allocated or 0
+            s["hits"] += e.cache == "hit"
+            s["misses"] += e.cache == "miss"
+            s["failures"] += e.failed
+        for s in stats.values():
+            s["mean_wall"] = s["wall"] / s["count"]
+        return stats
+
+    def chrome_trace(self, file: Optional[str] = None) -> Dict[str, List[dict]]:
+        """Events in the Chrome Trace Event format ('complete' events), optionally written to a JSON file."""
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": e.name, "cat": e.kind, "ph": "X", "pid": pid, "tid": e.tid,
+                    "ts": (e.start - self.origin) / 1000, "dur": e.wall / 1000,
+                    "args": {
+                        "cpu_ms": e.cpu / 1e6, "input_bytes": e.input_bytes, "output_bytes": e.output_bytes,
+                        "allocated": e.allocated, "cache": e.cache, "failed": e.failed
+                    },
+                }
+                for e in self.events
+            ]
+        }
+        if file is not None:
+            with open(file, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+    def clear(self):
+        self.events.clear()
+
+    def _frames(self) -> list:
+        try:
+            return self._local.frames
+        except AttributeError:
+            self._local.frames = []
+            return self._local.frames
+
+
+# Active recorder; None means disabled.
+recorder: Optional[Recorder] = None
+# Whether tracemalloc was started by enable() (and not by the user), i.e. whether disable() should stop it.
+_started_tracemalloc = False
+
+
+def enable(size: int = 100_000, memory: bool = False) -> Recorder:
+    """Start recording events into a new Recorder, see Recorder."""
+    global recorder, _started_tracemalloc
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    recorder = Recorder(size, memory)
+    return recorder
+
+
+def disable() -> Optional[Recorder]:
+    """Stop recording. Return the last active Recorder, if any."""
+    global recorder, _started_tracemalloc
+    last, recorder = recorder, None
+    if _started_tracemalloc and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _started_tracemalloc = False
+    return last
+
+
+def _nbytes(content) -> int:
+    """Size of the ready numpy matrices of a Data object or tuple of Data objects (lazy fields are not touched)."""
+    if content is None:
+        return 0
+    if isinstance(content, tuple):
+        return sum(map(_nbytes, content))
+    matrices = getattr(content, "matrices", None) or {}
+    return sum(m.nbytes for m in matrices.values() if isinstance(m, np.ndarray))
@@ -0,0 +1,132 @@
+"""Memory accounting for populations of Data objects, which share matrices and histories."""
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterable, Iterator, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from pjdata.aux.chunked import ChunkedMatrix
+from pjdata.aux.uuid import UUID
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+
+
+def memory_report(datas: Iterable[t.Data]) -> Dict[str, Dict[str, int]]:
+    """Measure the memory really used by a set of Data objects.
+
+    Objects (matrices, UUIDs, history nodes, transformers) are deduplicated by identity.
+    An object referenced by a single Data object is 'unique', otherwise it is 'shared' (and counted once).
+    'naive' is the amount one would get by summing each Data object separately.
+    Numpy views are accounted as their base array.
+    Memory-mapped arrays and deferred (callable) fields are not resident, so they count as zero.
+    History nodes include what they memoize (flattened tuple, uuid, trie children and serialized steps).
+
+    Returns
+    -------
+    Dict like {category: {"unique": bytes, "shared": bytes, "naive": bytes}} with a "total" entry.
+    Categories are the matrix names, "uuids", "history" and "data" (the Data objects themselves).
+    """
+    seen: Dict[int, list] = {}  # id -> [category, size, number of Data objects referencing it, object]
+    for data in datas:
+        local = set()
+        for category, obj in _objects(data):
+            key = id(obj)
+            if key in local:
+                continue
+            local.add(key)
+            if key in seen:
+                seen[key][2] += 1
+            else:
+                seen[key] = [category, _sizeof(obj), 1, obj]  # Keeping obj avoids reuse of its id.
+
+    report: Dict[str, Dict[str, int]] = {}
+    total = {"unique": 0, "shared": 0, "naive": 0}
+    for category, size, refs, _ in seen.values():
+        entry = report.setdefault(category, {"unique": 0, "shared": 0, "naive": 0})
+        kind = "unique" if refs == 1 else "shared"
+        for dic in [entry, total]:
+            dic[kind] += size
+            dic["naive"] += size * refs
+    report["total"] = total
+    return report
+
+
+def _objects(data: t.Data) -> Iterator[Tuple[str, Any]]:
+    """All objects held by a Data object, tagged by category."""
+    yield "data", data
+    yield "data", data.matrices
+
+    for name, m in data.matrices.items():
+        if isinstance(m, ChunkedMatrix):
+            yield name, m
+            for chunk in m.chunks:
+                if isinstance(chunk, np.ndarray):
+                    yield name, _base(chunk)
+        elif isinstance(m, np.ndarray):
+            yield name, _base(m)
+        else:
+            yield name, m
+
+    yield "uuids", data.uuids
+    for uuid in [data.uuid] + list(data.uuids.values()):
+        yield "uuids", uuid
+
+    # Iterative traversal: histories can be deeper than the recursion limit.
+    stack = [data.history]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        yield "history", node
+        if node.isleaf:
+            yield "history", node.transformer
+            if node._step is not None:
+                yield from _jsonable("history", node._step)
+        else:
+            yield "history", node.nested
+            stack.extend(node.nested)
+            # Memoized on demand: flattened tuple, uuid and trie children.
+            for memo in [node._flat, node._uuid, node._children]:
+                if memo is not None:
+                    yield "history", memo
+
+
+def _jsonable(category: str, obj: Any) -> Iterator[Tuple[str, Any]]:
+    """A (nested) jsonable structure and everything inside it."""
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        yield category, obj
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+
+
+def _base(m: np.ndarray) -> np.ndarray:
+    """The array that really owns the memory of a (possibly nested) view."""
+    while isinstance(m.base, np.ndarray):
+        m = m.base
+    return m
+
+
+def _sizeof(obj: Any) -> int:
+    if isinstance(obj, np.memmap):
+        return sys.getsizeof(obj)
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) if obj.flags.owndata else sys.getsizeof(obj) + obj.nbytes
+    if isinstance(obj, ChunkedMatrix):
+        return sys.getsizeof(obj) + sys.getsizeof(obj.chunks)
+    if isinstance(obj, UUID):
+        # Lazy attributes, only those already calculated. The permutation matrix has only small (interned) ints.
+        parts = [obj._n, obj._m, obj._id]
+        return sys.getsizeof(obj) + sys.getsizeof(obj.__dict__) + sum(sys.getsizeof(p) for p in parts if p is not None)
+    if isinstance(obj, list) and obj and isinstance(obj[0], (str, float, int)):
+        # Descriptions, types, and other small list fields.
+        return sys.getsizeof(obj) + sum(sys.getsizeof(item) for item in obj)
+    if hasattr(obj, "__dict__") and not isinstance(obj, type):
+        return sys.getsizeof(obj) + sys.getsizeof(obj.__dict__)
+    return sys.getsizeof(obj)
@@ -1,4 +1,5 @@
 import json
+from functools import lru_cache
 
 from pjdata.aux.customjsonencoder import CustomJSONEncoder
 
@@ -7,7 +8,21 @@ def serialize(obj):
     return json.dumps(obj, cls=CustomJSONEncoder, sort_keys=True, ensure_ascii=False)
 
 
-def deserialize(txt):
+def deserialize(txt, lazy=False):
+    """Component represented by a serialized text.
+
+    A new instance is returned at each call, since components may keep state; only class lookups are memoized.
+
+    Parameters
+    ----------
+    txt
+        Output of serialize().
+    lazy
+        Return a LazyComponent, which is only instantiated when an attribute other than the
+        serialized information (name, path, config, serialized, ...) is accessed.
+    """
+    if lazy:
+        return LazyComponent(txt)
     return _dict_to_component(json.loads(txt))
 
 
@@ -32,6 +47,43 @@ def materialize(name, path, config):
         raise Exception(f"Problems materializing {name}@{path} with config\n{config}")
 
 
+class LazyComponent:
+    """Placeholder for a component that is instantiated only at the first access to a non-serialized attribute.
+
+    E.g. PHolder needs only name, path, config, flags and serialized text, so it can be built without
+    importing/instantiating the component.
+    """
+
+    def __init__(self, txt):
+        self._component = None
+        self.serialized = txt
+        dic = json.loads(txt)
+        self.name, self.path = dic["info"]["id"].split("@")
+        self.config = dic["info"]["config"]
+        self.jsonable = dic
+        if "enhance" in dic and "model" in dic:
+            self.hasenhancer, self.hasmodel = dic["enhance"], dic["model"]
+
+    @property
+    def component(self):
+        """The component, instantiated at the first access (one instance per proxy)."""
+        if self._component is None:
+            self._component = deserialize(self.serialized)
+        return self._component
+
+    def __getattr__(self, item):
+        # Only called for attributes not set in __init__.
+        if item in ("_component", "serialized", "component"):  # E.g. before __init__.
+            raise AttributeError(item)
+        return getattr(self.component, item)
+
+    def __reduce__(self):
+        return LazyComponent, (self.serialized,)
+
+    def __repr__(self):
+        return f"LazyComponent({self.name}@{self.path})"
+
+
 def _dict_to_component(dic):
     """Convert recursively a dict to a component."""
     if "info" not in dic:
@@ -44,6 +96,7 @@ def _dict_to_component(dic):
     return materialize(name, path, cfg)
 
 
+@lru_cache(maxsize=None)
 def _get_class(module, class_name):
     import importlib
 
@@ -0,0 +1,192 @@
+"""Registry of matrices in shared memory, keyed by matrix UUID, to avoid one copy per worker process.
+
+The process that exports a matrix owns its shared memory block (reference counted by share()/release()).
+Other processes receive only a small pickable SharedMatrix handle and attach to the block as a read-only view.
+A released (or detached) block is closed, and unlinked by its owner, only once the last of its views is freed,
+e.g. along with the Data objects holding them.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import weakref
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
+
+import numpy as np  # type: ignore
+from numpy import ndarray
+
+from pjdata.aux.uuid import UUID
+from pjdata.config import threadLock
+
+# uuid id -> [SharedMemory, handle, reference count]  (owner side)
+_owned: Dict[str, list] = {}
+# block name -> [SharedMemory, reference count]  (attached side)
+_attached: Dict[str, list] = {}
+# Forked children inherit the registry, but only the original process can free the blocks.
+_pid = os.getpid()
+# Blocks -> number of arrays (views) exposing them in this process.
+_views: Dict[shared_memory.SharedMemory, int] = {}
+# Blocks -> whether to unlink them, once released but still exposed by views (see _close()).
+_closing: Dict[shared_memory.SharedMemory, bool] = {}
+# Blocks of views freed while the registry was locked, accounted by the next _sweep().
+_freed: List[shared_memory.SharedMemory] = []
+
+
+class SharedMatrix:
+    """Pickable handle to a matrix in shared memory. Data.field() attaches it transparently."""
+
+    def __init__(self, uuid: UUID, name: str, shape: Tuple[int, ...], dtype: str):
+        self.uuid = uuid
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def attach(self) -> ndarray:
+        """Read-only view of the shared matrix (no copy)."""
+        with threadLock:
+            if self.uuid.id in _owned and _owned[self.uuid.id][1].name == self.name:
+                shm = _owned[self.uuid.id][0]
+            else:
+                if self.name not in _attached:
+                    _attached[self.name] = [_open(self.name), 0]
+                _attached[self.name][1] += 1
+                shm = _attached[self.name][0]
+            m = _view(shm, self.shape, self.dtype)
+        m.flags.writeable = False
+        return m
+
+    def copy(self) -> ndarray:
+        """Private (writable) copy of the shared matrix, e.g. to persist it; the block is not kept attached."""
+        m = self.attach().copy()
+        self.detach()
+        return m
+
+    def detach(self):
+        """Close the block in this process after the last detach(), as soon as the views from attach() are freed."""
+        with threadLock:
+            if self.name in _attached:
+                _attached[self.name][1] -= 1
+                if _attached[self.name][1] <= 0:
+                    _close(_attached.pop(self.name)[0], unlink=False)
+
+    def __repr__(self):
+        return f"SharedMatrix({self.uuid.id}, {self.name}, {self.shape}, {self.dtype})"
+
+
+def share(uuid: UUID, m: ndarray) -> SharedMatrix:
+    """Copy a matrix to shared memory, once per UUID; further calls only increment its reference count."""
+    with threadLock:
+        if uuid.id in _owned:
+            _owned[uuid.id][2] += 1
+            return _owned[uuid.id][1]
+        m = np.ascontiguousarray(m)
+        if m.dtype.hasobject:
+            raise Exception(f"Cannot share a matrix of Python objects ({uuid.id})!")
+        shm = shared_memory.SharedMemory(create=True, size=max(m.nbytes, 1))
+        _view(shm, m.shape, m.dtype)[...] = m
+        handle = SharedMatrix(uuid, shm.name, m.shape, m.dtype.str)
+        _owned[uuid.id] = [shm, handle, 1]
+        return handle
+
+
+def release(uuid: UUID):
+    """Decrement the reference count of an exported matrix, freeing the block when it reaches zero."""
+    with threadLock:
+        if uuid.id not in _owned:
+            return
+        _owned[uuid.id][2] -= 1
+        if _owned[uuid.id][2] <= 0:
+            _close(_owned.pop(uuid.id)[0], unlink=os.getpid() == _pid)
+
+
+def cleanup():
+    """Free all blocks exported by this process and close all attached ones. Called at exit.
+
+    Blocks still exposed by views stay mapped (until the views are freed), but their names are unlinked."""
+    with threadLock:
+        for shm, _ in _attached.values():
+            _close(shm, unlink=False)
+        _attached.clear()
+        for shm, _, _ in _owned.values():
+            _close(shm, unlink=os.getpid() == _pid)
+        _owned.clear()
+        for shm, unlink in _closing.items():
+            if unlink:
+                shm.unlink()
+                _closing[shm] = False
+
+
+def exported() -> List[SharedMatrix]:
+    """Handles currently owned by this process."""
+    return [handle for _, handle, _ in _owned.values()]
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    """Attach without letting the resource tracker of this process unlink the block at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        import multiprocessing
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        # Child processes share the resource tracker of the owner, i.e. the registration is the same.
+        if multiprocessing.parent_process() is None:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _view(shm: shared_memory.SharedMemory, shape: Tuple[int, ...], dtype) -> ndarray:
+    """Array exposing the block, counted until it (and every array derived from it) is freed. Call under threadLock."""
+    _sweep()
+    m = np.frombuffer(shm.buf, dtype=dtype, count=int(np.prod(shape)))
+    # The memoryview made by frombuffer() is freed after releasing the buffer, i.e. the block can be closed then.
+    holder = m.base if isinstance(m.base, memoryview) else m
+    _views[shm] = _views.get(shm, 0) + 1
+    weakref.finalize(holder, _free, shm).atexit = False
+    return m.reshape(shape)
+
+
+def _free(shm: shared_memory.SharedMemory):
+    _freed.append(shm)
+    # Views can be freed anywhere, e.g. by a thread holding the (non-reentrant) lock: then the next _sweep() does it.
+    if threadLock.acquire(blocking=False):
+        try:
+            _sweep()
+        finally:
+            threadLock.release()
+
+
+def _sweep():
+    """Close the released blocks no view exposes anymore. Call under threadLock."""
+    _account()
+    for shm in [shm for shm in _closing if shm not in _views]:
+        _close(shm, _closing.pop(shm))
+
+
+def _account():
+    """Decrement the view counts of freed views. Call under threadLock."""
+    while _freed:
+        shm = _freed.pop()
+        _views[shm] -= 1
+        if _views[shm] == 0:
+            del _views[shm]
+
+
+def _close(shm: shared_memory.SharedMemory, unlink: bool):
+    """Close (and unlink) a block, or postpone it until its views are freed. Call under threadLock."""
+    _account()
+    if shm not in _views:
+        try:
+            shm.close()
+        except BufferError:  # Exposed otherwise (e.g. a memoryview of shm.buf): retried by the next _sweep().
+            pass
+        else:
+            if unlink:
+                shm.unlink()
+            return
+    _closing[shm] = unlink
+
+
+atexit.register(cleanup)
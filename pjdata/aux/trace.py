@@ -1,36 +1,264 @@
+"""Structured, low-overhead tracing of function calls (spans), e.g. of hot functions like pack or Data.field.
+
+    @TraceCalls(sample=0.01)
+    def f(...): ...
+
+Nesting is kept in a context variable (correct under threads and asyncio). Arguments are captured when the call ends
+as cheap summaries (type, shape, length, short scalars; full size-limited reprs are opt-in) and spans are written by
+a sink in a background thread; decorators share one sink per stream, so a single thread writes their spans in order.
+A full sink drops spans instead of blocking the traced code.
+"""
+import atexit
+import inspect
+import itertools
+import json
+import queue
+import random
+import reprlib
 import sys
+import threading
+import time
+from contextvars import ContextVar
 from functools import wraps
+from typing import NamedTuple, Optional, Tuple, Dict
+
+# (span id, depth, sampled) of the innermost active span.
+_current: ContextVar[Optional[Tuple[int, int, bool]]] = ContextVar("span", default=None)
+_ids = itertools.count(1)
+
+
+class Span(NamedTuple):
+    name: str
+    id: int
+    parent: Optional[int]
+    depth: int
+    start: float  # time.time()
+    duration: float  # Seconds.
+    thread: int
+    args: Optional[Tuple[str, ...]]  # Captured when the call ends, see _summary() and _repr().
+    kwargs: Optional[Dict[str, str]]
+    ret: Optional[str]
+    error: Optional[str]
 
 
-class TraceCalls(object):
-    """ Use as a decorator on functions that should be traced. Several
-        functions can be decorated - they will all be indented according
-        to their call depth.
+class BufferedSink:
+    """Write spans to a stream from a background thread.
+
+    Parameters
+    ----------
+    stream
+        Where to write.
+    size
+        Maximum number of pending spans. Further spans are dropped (and counted) until there is room again.
+    format
+        'text' (indented calls) or 'json' (one object per line).
+        Spans are written when calls end, i.e. nested calls come before the call that made them.
+    indent_step
+        Indentation per depth level (text format).
     """
 
-    def __init__(self, stream=sys.stdout, indent_step=2, show_ret=False):
+    def __init__(self, stream=sys.stdout, size: int = 10_000, format: str = "text", indent_step: int = 2):
+        if format not in ["text", "json"]:
+            raise Exception(f"Unknown format: {format}. Options: text, json.")
         self.stream = stream
+        self.format = format
         self.indent_step = indent_step
-        self.show_ret = show_ret
+        self.dropped = 0
+        self.failed = 0  # Spans that could not be written.
+        self._queue: queue.Queue = queue.Queue(maxsize=size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def put(self, span: Span):
+        """Never blocks."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until all pending spans are written."""
+        if self._thread is not None:
+            self._queue.join()
+            self.stream.flush()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _work(self):
+        while True:
+            span = self._queue.get()
+            try:
+                self.stream.write(self._format(span))
+            except Exception:  # E.g. a closed stream; neither the program nor this thread must be interrupted.
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def _format(self, span: Span) -> str:
+        if self.format == "json":
+            return json.dumps(span._asdict()) + "\n"
+        indent = " " * (span.depth * self.indent_step)
+        args = [] if span.args is None else list(span.args)
+        args += [] if span.kwargs is None else [f"{k}={v}" for k, v in span.kwargs.items()]
+        line = f"{indent}{span.name}({', '.join(args)}) [{span.duration * 1000:.3f}ms]\n"
+        if span.error is not None:
+            line += f"{indent}--> raised {span.error}\n"
+        elif span.ret is not None:
+            line += f"{indent}--> {span.ret}\n"
+        return line
+
+
+# Sinks shared by decorators without an explicit sink, one per (stream, indent_step).
+_sinks: Dict[Tuple[int, int], BufferedSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def shared_sink(stream=sys.stdout, indent_step: int = 2) -> BufferedSink:
+    """Text sink shared by all TraceCalls decorators writing to the given stream."""
+    with _sinks_lock:
+        key = id(stream), indent_step
+        if key not in _sinks:
+            _sinks[key] = BufferedSink(stream, indent_step=indent_step)
+        return _sinks[key]
+
 
-        # This is a class attribute since we want to share the indentation
-        # level between different traced functions, in case they call
-        # each other.
-        TraceCalls.cur_indent = 0
+_reprlib = reprlib.Repr()
+_reprlib.maxstring = _reprlib.maxother = 200
+
+
+def _repr(obj) -> str:
+    """Size-limited repr(), formatted right away so that no reference to (possibly large or mutable) objects is kept."""
+    try:
+        return _reprlib.repr(obj)
+    except Exception as e:  # Tracing must not interrupt the program.
+        return f"<{type(obj).__name__}: repr() failed ({type(e).__name__})>"
+
+
+def _summary(obj) -> str:
+    """Constant-time description of an object: short scalars as is, otherwise type plus shape or length."""
+    if obj is None or isinstance(obj, (bool, int, float)):
+        return repr(obj)
+    if isinstance(obj, str):
+        return repr(obj) if len(obj) <= 40 else f"<str len={len(obj)}>"
+    name = type(obj).__name__
+    shape = getattr(obj, "shape", None)
+    if isinstance(shape, tuple):
+        return f"<{name} shape={shape} dtype={getattr(obj, 'dtype', '?')}>"
+    try:
+        return f"<{name} len={len(obj)}>"
+    except Exception:  # No (or a broken) __len__.
+        return f"<{name}>"
+
+
+class TraceCalls:
+    """Use as a decorator on functions that should be traced.
+
+    Spans of decorated functions that call each other are nested (depth, parent), also across
+    different TraceCalls instances.
+
+    Parameters
+    ----------
+    stream
+        Where to write, through the sink shared by all decorators writing there (ignored if 'sink' is given).
+    indent_step
+        Indentation per nesting level (text format).
+    show_ret
+        Whether to capture the returned values.
+    sample
+        Fraction of the outermost traced calls that are recorded; nested calls follow the decision of the outermost.
+    capture_args
+        Whether to capture the arguments (summarized when the call ends, see full_repr).
+    full_repr
+        Capture size-limited reprs of arguments and returned values instead of cheap summaries (type, shape, length).
+        Much slower for large objects, since they are formatted by the traced code.
+    sink
+        Object with a put(span) method, e.g. a BufferedSink shared by many decorators.
+    """
+
+    def __init__(
+            self, stream=sys.stdout, indent_step=2, show_ret=False, sample: float = 1.0, capture_args=True, sink=None,
+            full_repr=False
+    ):
+        self.sink = shared_sink(stream, indent_step) if sink is None else sink
+        self.show_ret = show_ret
+        self.sample = sample
+        self.capture_args = capture_args
+        self._format = _repr if full_repr else _summary
 
     def __call__(self, fn):
+        name = fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def wrapper(*args, **kwargs):
+                span, token = self._enter()
+                if span is None:
+                    try:
+                        return await fn(*args, **kwargs)
+                    finally:
+                        _current.reset(token)
+                ret, error = None, None
+                try:
+                    ret = await fn(*args, **kwargs)
+                    return ret
+                except BaseException as e:
+                    error = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    self._exit(name, span, token, args, kwargs, ret, error)
+
+            return wrapper
+
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            indent = " " * TraceCalls.cur_indent
-            argstr = ", ".join([repr(a) for a in args] + ["%s=%s" % (a, repr(b)) for a, b in kwargs.items()])
-            self.stream.write("%s%s(%s)\n" % (indent, fn.__name__, argstr))
+            span, token = self._enter()
+            if span is None:
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    _current.reset(token)
+            ret, error = None, None
+            try:
+                ret = fn(*args, **kwargs)
+                return ret
+            except BaseException as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                self._exit(name, span, token, args, kwargs, ret, error)
 
-            TraceCalls.cur_indent += self.indent_step
-            ret = fn(*args, **kwargs)
-            TraceCalls.cur_indent -= self.indent_step
+        return wrapper
 
-            if self.show_ret:
-                self.stream.write("%s--> %s\n" % (indent, ret))
-            return ret
+    def _enter(self):
+        """Open a span in the current context. Return (None, token) if it is not sampled."""
+        parent = _current.get()
+        if parent is None:
+            sampled = self.sample >= 1 or random.random() < self.sample
+            depth, parent_id = 0, None
+        else:
+            parent_id, depth, sampled = parent
+            depth += 1
+        if not sampled:
+            return None, _current.set((parent_id, depth, False))
+        span_id = next(_ids)
+        token = _current.set((span_id, depth, True))
+        return (span_id, parent_id, depth, time.time(), time.perf_counter()), token
 
-        return wrapper
+    def _exit(self, name, span, token, args, kwargs, ret, error):
+        span_id, parent_id, depth, start, t0 = span
+        duration = time.perf_counter() - t0
+        _current.reset(token)
+        fmt = self._format
+        self.sink.put(Span(
+            name, span_id, parent_id, depth, start, duration, threading.get_ident(),
+            tuple(map(fmt, args)) if self.capture_args else None,
+            {k: fmt(v) for k, v in kwargs.items()} if self.capture_args and kwargs else None,
+            fmt(ret) if self.show_ret and ret is not None else None, error
+        ))
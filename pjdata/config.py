@@ -24,3 +24,8 @@ except FileNotFoundError:
 STORAGE_CONFIG["default_dump"] = {"engine": "dump"}
 STORAGE_CONFIG["default_sqlite"] = {"engine": "sqlite"}
 STORAGE_CONFIG["storages"] = {}
+
+# Caches (see pjdata.aux.cache), e.g. CACHE_CONFIG["models"] = TieredCache(MemoryCache(), DiskCache("/tmp/models")).
+# models: fitted Model info, keyed by Model uuid.
+# results: Data objects output by Data.transformedby(), keyed by their (predicted) uuid; see also StorageCache.
+CACHE_CONFIG = {"models": None, "results": None}
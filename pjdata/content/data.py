@@ -1,24 +1,29 @@
 from __future__ import annotations
 
 import json
+import string
 import traceback
+from copy import deepcopy
 from functools import lru_cache, cached_property
-from typing import Optional, TYPE_CHECKING, Iterator, Union, Literal, Dict, List
+from typing import Optional, TYPE_CHECKING, Iterator, Union, Literal, Dict, List, Sequence, Tuple
 
 import arff
 
+from pjdata.aux.chunked import ChunkedMatrix
 from pjdata.aux.customjsonencoder import CustomJSONEncoder
+from pjdata.aux.sharedmemory import SharedMatrix, share
 from pjdata.mixin.identification import withIdentification
 from pjdata.mixin.printing import withPrinting
 
 if TYPE_CHECKING:
     import pjdata.types as t
 import pjdata.aux.compression as com
+import pjdata.aux.instrumentation as instrumentation
 import pjdata.aux.uuid as u
 import pjdata.mixin.linalghelper as li
 import pjdata.transformer.transformer as tr
 from pjdata.aux.util import Property
-from pjdata.config import STORAGE_CONFIG
+from pjdata.config import CACHE_CONFIG
 import pjdata.history as h
 import numpy as np
 
@@ -57,6 +62,8 @@ class Data(withIdentification, withPrinting):
            'mouse'
         ]
         They can be, ideally, numpy arrays (e.g. storing is optimized).
+        Matrices larger than RAM can be given as a ChunkedMatrix (row blocks).
+        Matrices in shared memory are given as SharedMatrix handles (see shared()).
         A matrix name followed by a 'd' indicates its description, e.g.:
         Xd=['weight', 'height', 'color']
         Yd=['class']
@@ -67,7 +74,12 @@ class Data(withIdentification, withPrinting):
         Yt=[['rabbit', 'mouse']]
     """
 
+    # Most attributes are slots, the remaining __dict__ is left for cached properties and rare attributes.
+    __slots__ = ("history", "_failure", "_frozen", "_hollow", "stream", "storage_info", "matrices", "_uuid", "uuids")
     _Xy = None
+    # Defaults shared by all instances, hence immutable.
+    target: Tuple[str, ...] = ("s", "r")
+    historystr: Sequence = ()
 
     def __init__(
             self,
@@ -83,9 +95,6 @@ class Data(withIdentification, withPrinting):
             historystr=None,
             **matrices,
     ):
-        if historystr is None:
-            historystr = []
-        self._jsonable = {"uuid": uuid, "history": history, "uuids": uuids}
         # TODO: Check if types (e.g. Mt) are compatible with values (e.g. M).
         # TODO:
         #  1- 'name' and 'desc'
@@ -93,20 +102,21 @@ class Data(withIdentification, withPrinting):
         #  3- dna property?
         #  4- task?
 
-        self.target = target.split(",")
+        if target != "s,r":
+            self.target = tuple(target.split(","))
+        if historystr:
+            self.historystr = historystr
         self.history = history
         self._failure = failure
         self._frozen = frozen
         self._hollow = hollow
         self.stream = stream
-        self._target = [field for field in self.target if field.upper() in matrices]
         self.storage_info = storage_info
         self.matrices = matrices
         self._uuid, self.uuids = uuid, uuids
-        self.historystr = historystr
 
     def _jsonable_impl(self):
-        return self._jsonable
+        return {"uuid": self.uuid, "history": self.history, "uuids": self.uuids}
 
     def updated(
             self,
@@ -166,7 +176,7 @@ class Data(withIdentification, withPrinting):
 
     @Property
     def jsonable(self):
-        return self._jsonable
+        return self._jsonable_impl()
 
     @cached_property
     def frozen(self):
@@ -241,6 +251,133 @@ class Data(withIdentification, withPrinting):
             **self.matrices,
         )
 
+    def shared(self) -> t.Data:
+        """Create a Data object whose numeric matrices live in shared memory, e.g. to send to worker processes.
+
+        Each matrix is copied once per UUID (see pjdata.aux.sharedmemory); the new Data object holds only
+        small pickable handles that other processes attach to as read-only views, without copying.
+        Blocks are freed by pjdata.aux.sharedmemory.release(uuid) or at the exit of this process."""
+        matrices = self.matrices.copy()
+        for name, m in self.matrices.items():
+            if callable(m) or isinstance(m, u.UUID):
+                m = self.field("unsafe" + name)
+            if isinstance(m, np.ndarray) and not m.dtype.hasobject:
+                matrices[name] = share(self.uuids[name], m)
+        return Data(
+            history=self.history,
+            failure=self.failure,
+            frozen=self.isfrozen,
+            hollow=self.ishollow,
+            stream=self.stream,
+            storage_info=self.storage_info,
+            uuid=self.uuid,
+            uuids=self.uuids,
+            historystr=self.historystr,
+            **matrices,
+        )
+
+    def unshared(self) -> t.Data:
+        """Create a Data object holding private copies of the matrices in shared memory (see shared()).
+
+        Useful before persisting a Data object, since handles are meaningless once their blocks are freed."""
+        if not any(isinstance(m, SharedMatrix) for m in self.matrices.values()):
+            return self
+        matrices = {name: m.copy() if isinstance(m, SharedMatrix) else m for name, m in self.matrices.items()}
+        return Data(
+            history=self.history,
+            failure=self.failure,
+            frozen=self.isfrozen,
+            hollow=self.ishollow,
+            stream=self.stream,
+            storage_info=self.storage_info,
+            uuid=self.uuid,
+            uuids=self.uuids,
+            historystr=self.historystr,
+            **matrices,
+        )
+
+    def take(self, rows) -> t.Data:
+        """Create a Data object containing only the given rows (e.g. a CV fold).
+
+        Row-aligned matrices (single letter names with as many rows as X, e.g. Y, but not a 1x1 S) are not copied:
+        the indexing is deferred until the field is actually accessed.
+        Other matrices and descriptions/types (e.g. Xd, Xt) are kept as they are.
+        Lazy fields are resolved beforehand, since their number of rows is not known otherwise.
+
+        Parameters
+        ----------
+        rows
+            Sequence of row indices (negative ones count from the end) or boolean mask.
+            Contiguous indices are handled as a slice, i.e. a true numpy view.
+
+        Returns
+        -------
+        New Data object with UUID derived from the current one and the index set.
+        """
+        idx = np.asarray(rows)
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        idx = idx.astype(np.int64, copy=False).ravel()
+        nrows = self._nrows()
+        idx = np.where(idx < 0, idx + nrows, idx)
+        if len(idx) > 0 and (idx.min() < 0 or idx.max() >= nrows):
+            raise Exception(f"Row index out of range for {nrows} rows: {rows}")
+        if len(idx) > 0 and idx[-1] - idx[0] == len(idx) - 1 and np.all(np.diff(idx) == 1):
+            return self.slice(int(idx[0]), int(idx[-1]) + 1)
+        return self._subset(idx, u.UUID(idx.tobytes()))
+
+    def slice(self, start: int, stop: int) -> t.Data:
+        """Create a Data object containing only the rows in the range [start, stop).
+
+        Row-aligned matrices become numpy views, no copy is made.
+        See take() for details; the UUID is the same as take(range(start, stop)), with 'stop' limited to the number
+        of rows (as in numpy)."""
+        if not 0 <= start <= stop:
+            raise Exception(f"Invalid row range: [{start}, {stop})")
+        nrows = self._nrows()
+        start, stop = min(start, nrows), min(stop, nrows)
+        return self._subset(slice(start, stop), u.UUID(np.arange(start, stop, dtype=np.int64).tobytes()))
+
+    def _nrows(self) -> int:
+        """Number of rows of X (or of the first single letter matrix), 0 if there is none."""
+        names = [name for name in self.matrices if len(name) == 1]
+        if not names:
+            return 0
+        return self._rowcount("X" if "X" in names else names[0])
+
+    def _rowcount(self, name) -> int:
+        m = self.matrices[name]
+        if callable(m) or isinstance(m, u.UUID):
+            m = self.field("unsafe" + name)
+        return m.shape[0] if hasattr(m, "shape") else len(m)
+
+    def _subset(self, rows: Union[slice, np.ndarray], rows_uuid: u.UUID) -> t.Data:
+        matrices, uuids = self.matrices.copy(), self.uuids.copy()
+        nrows = self._nrows()
+        for name, m in self.matrices.items():
+            if len(name) != 1 or self._rowcount(name) != nrows:
+                continue
+            if isinstance(rows, slice) and isinstance(m, np.ndarray):
+                matrices[name] = m[rows]
+            elif isinstance(m, np.ndarray):
+                matrices[name] = lambda m=m: m[rows]
+            else:
+                # Lazy, fetched or list field: resolve it through the current Data object only when needed.
+                matrices[name] = lambda name=name: _rows(self.field("unsafe" + name), rows)
+            uuids[name] = self.uuids.get(name, self.uuid * u.UUID(bytes(name, "latin1"))) * rows_uuid
+
+        return Data(
+            history=self.history,
+            failure=self.failure,
+            frozen=self.isfrozen,
+            hollow=self.ishollow,
+            stream=self.stream,
+            storage_info=self.storage_info,
+            uuid=self.uuid * rows_uuid,
+            uuids=uuids,
+            **matrices,
+        )
+
     @lru_cache()
     def field(self, name, block=False, context: t.Context = "undefined"):
         """
@@ -258,6 +395,7 @@ class Data(withIdentification, withPrinting):
         Returns
         -------
         Matrix, vector or scalar
+        A ChunkedMatrix is returned as is for matrices (iterate over its row blocks) and concatenated for vectors.
         """
         # TODO: better organize this code
         name = self._remove_unsafe_prefix(name, context)
@@ -285,6 +423,10 @@ class Data(withIdentification, withPrinting):
             print(">>>> fetching field", name, m.id)
             self.matrices[mname] = m = self._fetch_matrix(m.id)
 
+        # Attach to shared memory?...
+        if isinstance(m, SharedMatrix):
+            m = m.attach()  # The handle is kept, it is what should be pickled.
+
         # Fetch previously deferred value?...
         if callable(m):
             if block:
@@ -306,6 +448,12 @@ class Data(withIdentification, withPrinting):
         """Return this Data object transformed by func.
 
         Return itself if it is frozen or failed."""
+        recorder = instrumentation.recorder
+        if recorder is not None:
+            return recorder.measure("transformedby", transformer, self, self._transformedby, transformer)
+        return self._transformedby(transformer)
+
+    def _transformedby(self, transformer: tr.Transformer) -> t.Data:
         # REMINDER: It is preferable to have this method in Data instead of Transformer because of the different
         # data handling depending on the type of content: Data, NoData.
         if self.isfrozen or self.failure:
@@ -313,9 +461,32 @@ class Data(withIdentification, withPrinting):
             output_data = self.updated([transformer])  # TODO: check if Pholder here is what we want
             # print(888777777777777777777777)
         else:
-            output_data = transformer._transform_impl(self)
-            if isinstance(output_data, dict):
-                output_data = self.updated(transformers=[transformer], **output_data)
+            # The output UUID is known in advance, so the result may be already cached.
+            cache = CACHE_CONFIG["results"]
+            key = None if cache is None else (self.uuid * transformer.uuid).id
+            output_data = None if cache is None else cache.get(key)
+            if cache is not None and instrumentation.recorder is not None:
+                instrumentation.recorder.note("cache", "miss" if output_data is None else "hit")
+            if output_data is None:
+                output_data = transformer._transform_impl(self)
+                if isinstance(output_data, dict):
+                    output_data = self.updated(transformers=[transformer], **output_data)
+                if cache is not None and output_data.stream is None:  # A stream can be consumed only once.
+                    cache.set(key, output_data)
+            else:
+                # A copy, since the cached object is shared; history is not kept by pickling/storages anyway.
+                output_data = Data(
+                    history=self.history << [transformer],
+                    failure=output_data.failure,
+                    frozen=output_data.isfrozen,
+                    hollow=output_data.ishollow,
+                    stream=None,
+                    target=",".join(output_data.target),
+                    storage_info=output_data.storage_info,
+                    uuid=output_data.uuid,
+                    uuids=output_data.uuids,
+                    **output_data.matrices,
+                )
             # print(888777777777777777777777999999999999999999999999)
 
         # TODO: In the future, remove this temporary check. It has a small cost, but is useful while in development:
@@ -373,6 +544,12 @@ class Data(withIdentification, withPrinting):
     def matrix_names_str(self):
         return ",".join(self.matrix_names)
 
+    def memory_report(self):
+        """Memory used by this Data object, by field. See pjdata.aux.memory.memory_report() for populations."""
+        from pjdata.aux.memory import memory_report
+
+        return memory_report([self])
+
     @Property
     def isfrozen(self):
         return self._frozen
@@ -385,7 +562,9 @@ class Data(withIdentification, withPrinting):
     def _fetch_matrix(self, id):
         if self.storage_info is None:
             raise Exception(f"There is no storage set to fetch {id})!")
-        return STORAGE_CONFIG["storages"][self.storage_info].fetch_matrix(id)
+        from pjdata.storage.storage import get_storage
+
+        return get_storage(self.storage_info).fetch_matrix(id)
 
     def _remove_unsafe_prefix(self, item, component: withIdentification = "undefined"):
         """Handle unsafe (i.e. frozen) fields."""
@@ -411,7 +590,9 @@ class Data(withIdentification, withPrinting):
         return self._failure
 
     def __getattr__(self, item):
-        """Create shortcuts to fields, still passing through sanity check."""
+        """Create shortcuts to fields, still passing through sanity check.
+
+        Single letter fields have precomputed shortcuts, see _shortcut()."""
         # if item == "Xy":
         #     return self.Xy
         if 0 < (len(item) < 3 or item.startswith("unsafe")):
@@ -421,10 +602,12 @@ class Data(withIdentification, withPrinting):
         return super().__getattribute__(item)
 
     def __lt__(self, other):
-        """Amenity to ease pipeline result comparisons. 'A > B' means A is better than B."""
-        for name in self._target:
+        """Amenity to ease pipeline result comparisons. 'A > B' means A is better than B.
+
+        For many Data objects, see pjdata.ranking."""
+        for name in (field for field in self.target if field.upper() in self.matrices):
             return self.field(name) < other.field(name, context="comparison between Data objects")
-        return Exception("Impossible to make comparisons. None of the target fields are available:", self.target)
+        raise Exception("Impossible to make comparisons. None of the target fields are available:", self.target)
 
     def _name_impl(self):
         # return self._name
@@ -440,6 +623,46 @@ class Data(withIdentification, withPrinting):
     def __hash__(self) -> int:
         return hash(self.uuid)
 
+    def __reduce_ex__(self, protocol):
+        """Compact pickling, e.g. to send Data objects to process pools.
+
+        Like 'pickable': history is sent as historystr, the stream and cached values are dropped.
+        Deferred fields are resolved (e.g. rows from take()), so only the needed rows are sent.
+        Numpy matrices are shipped as PickleBuffers under protocol 5, i.e. out-of-band when the
+        pickler has a buffer_callback (and without an intermediate bytes copy otherwise)."""
+        matrices = {}
+        for name, m in self.matrices.items():
+            matrices[name] = self.field("unsafe" + name) if callable(m) else m
+        historystr = self.history.pickable if self.history is not None and self.history.nested else self.historystr
+        kwargs = {
+            "uuid": self.uuid,
+            "uuids": self.uuids,
+            "history": h.History([]),
+            "failure": self.failure,
+            "frozen": self.isfrozen,
+            "hollow": self.ishollow,
+            "stream": None,
+            "target": ",".join(self.target),
+            "storage_info": self.storage_info,
+            "historystr": historystr,
+        }
+        return _unpickle, (self.__class__, kwargs, matrices)
+
+    def __copy__(self):
+        """Shallow copy keeping history (copy would otherwise go through __reduce_ex__, which drops it)."""
+        new = self.__class__.__new__(self.__class__)
+        for name in Data.__slots__:
+            setattr(new, name, getattr(self, name))
+        new.__dict__.update(self.__dict__)
+        return new
+
+    def __deepcopy__(self, memo):
+        """Copy with independent matrices. History (immutable) and stream (not copiable) are kept as they are."""
+        new = self.__copy__()
+        memo[id(self)] = new
+        new.matrices = deepcopy(self.matrices, memo)
+        return new
+
     @lru_cache
     def arff(self, relation, description):
         Xt = [untranslate_type(typ) for typ in self.Xt]
@@ -463,11 +686,96 @@ class Data(withIdentification, withPrinting):
             }
             raise Exception(json.dumps(dic, cls=CustomJSONEncoder))
 
+    def write_arff(self, file, relation, description, block_size=1000):
+        """Write the same content as arff() to a file object, streaming blocks of rows.
+
+        Neither the entire dataset (column_stack) nor the entire text is kept in memory."""
+        Xt = [untranslate_type(typ) for typ in self.Xt]
+        Yt = [untranslate_type(typ) for typ in self.Yt]
+        attributes = list(zip(self.Xd, Xt)) + list(zip(self.Yd, Yt))
+        # The header comes from the arff encoder itself, it ends with '@DATA\n'.
+        file.write(arff.dumps({"description": description, "relation": relation, "attributes": attributes}))
+        for block in self._row_blocks(block_size):
+            if block.shape[1] != len(attributes):
+                raise arff.BadObject(f"Instances have {block.shape[1]} attributes, expected {len(attributes)}")
+            file.write("\n".join(_format_rows(block, _arff_value)) + "\n")
+
+    def write_csv(self, file, block_size=1000):
+        """Write X and Y (with Xd and Yd as header) to a file object as CSV, streaming blocks of rows."""
+        file.write(",".join(_csv_value(name) for name in list(self.Xd) + list(self.Yd)) + "\n")
+        for block in self._row_blocks(block_size):
+            file.write("\n".join(_format_rows(block, _csv_value)) + "\n")
+
+    def _row_blocks(self, block_size):
+        """Blocks of rows of X and Y side by side, with the same type promotion of np.column_stack((X, Y))."""
+        X, Y = self.X, self.Y
+        for start in range(0, X.shape[0], block_size):
+            yield np.column_stack((X[start:start + block_size], Y[start:start + block_size]))
+
 
 class MissingField(Exception):
     pass
 
 
+def _shortcut(name):
+    """Direct access to a single letter field, bypassing __getattr__ and the cache of field() for ready matrices."""
+    matrix = name.isupper()
+
+    def get(self):
+        if matrix and not (self._failure or self._frozen or self._hollow):
+            m = self.matrices.get(name)
+            if isinstance(m, np.ndarray):
+                return m
+        return self.field(name, context="[direct access through shortcut]")
+
+    return property(get)
+
+
+for _letter in string.ascii_letters:
+    setattr(Data, _letter, _shortcut(_letter))
+
+
+def _format_rows(block, encode):
+    """Lines of comma separated values, vectorized for numeric blocks."""
+    if block.dtype.kind in "biu":
+        strs = block.astype(str)
+    elif block.dtype.kind == "f":
+        strs = np.where(np.isnan(block), encode(None), block.astype(str))
+    else:
+        strs = np.frompyfunc(encode, 1, 1)(block)
+    return [",".join(row) for row in strs.tolist()]
+
+
+def _arff_value(value):
+    """Same encoding of arff.dumps()."""
+    if value is None or value == "" or value != value:
+        return "?"
+    return arff.encode_string(str(value))
+
+
+def _csv_value(value):
+    if value is None or value != value:
+        return ""
+    value = str(value)
+    if any(char in value for char in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _unpickle(cls, kwargs, matrices):
+    # Subclasses may have other constructors, but Data state.
+    data = cls.__new__(cls)
+    Data.__init__(data, **kwargs, **matrices)
+    return data
+
+
+def _rows(m, rows):
+    """Row subset of a matrix or list."""
+    if isinstance(m, (np.ndarray, ChunkedMatrix)) or isinstance(rows, slice):
+        return m[rows]
+    return [m[i] for i in rows]
+
+
 def untranslate_type(name):
     if isinstance(name, list):
         return name
@@ -16,18 +16,28 @@ class UUIDData(d.Data):
 
      The only available information is the UUID."""
 
-    def __init__(self, uuid: t.Union[u.UUID, str]):
+    def __init__(self, uuid: t.Union[u.UUID, str], uuids: Dict[str, u.UUID] = None, history: History = None):
+        """Matrix UUIDs and history are optional, e.g. for the output of a dry run (see pjdata.dryrun)."""
         if isinstance(uuid, str):
             uuid = u.UUID(uuid)
-        super().__init__(uuid, {}, history=History([]), failure=None, frozen=False, hollow=True, stream=None)
+        if history is None:
+            history = History([])
+        super().__init__(uuid, uuids or {}, history=history, failure=None, frozen=False, hollow=True, stream=None)
 
     def _uuid_impl(self) -> u.UUID:
         return self._uuid
 
+    def __reduce_ex__(self, protocol):
+        return UUIDData, (self.uuid, self.uuids)
+
     def __getattr__(self, item):
         if item not in ["id"]:
             raise Exception("This a UUIDData object. It has no fields!")
 
+    def field(self, name, block=False, context: t.Context = "undefined"):
+        # Also reached through the single letter shortcuts of Data (e.g. data.X), which precede __getattr__.
+        raise Exception("This a UUIDData object. It has no fields!")
+
     # else:
     #     return self.__getattribute__(item)
 
@@ -4,7 +4,6 @@ import arff
 import numpy as np
 import pjdata.mixin.linalghelper as li
 import sklearn.datasets as ds
-from pjdata.aux.compression import pack
 from pjdata.aux.uuid import UUID
 from pjdata.content.data import Data
 from pjdata.content.specialdata import NoData
@@ -81,7 +80,7 @@ def read_arff(filename):
 
     # Calculate pseudo-unique hash for X and Y, and a pseudo-unique name.
     matrices = {"X": X, "Y": Y, "Xd": Xd, "Yd": Yd, "Xt": Xt, "Yt": Yt}
-    uuids = {k: UUID(pack(v)) for k, v in matrices.items()}
+    uuids = {k: li.matrix_uuid(v) for k, v in matrices.items()}
     original_hashes = {k: v.id for k, v in uuids.items()}
 
     # # old, unique, name...
@@ -94,7 +93,7 @@ def read_arff(filename):
 
     # Create a temporary Data object (i.e. with a fake history).
     data = Data(
-        history=History([faketransformer]),
+        history=History([]) << [faketransformer],
         failure=None,
         frozen=False,
         hollow=False,
@@ -112,7 +111,7 @@ def read_arff(filename):
 
     # Patch the Data object with the real transformer and history.
     transformer = Step(FakeFile(filename, original_hashes))
-    data.history = History([transformer])
+    data.history = History([]) << [transformer]
 
     return original_hashes, data, name, description
 
@@ -0,0 +1,60 @@
+"""Symbolic execution of pipelines: only identities (UUIDs) and histories are propagated, nothing is computed.
+
+Useful for schedulers to obtain cache keys, query storages or deduplicate work before committing any compute.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, TYPE_CHECKING
+
+import pjdata.mixin.linalghelper as li
+from pjdata.content.specialdata import UUIDData
+from pjdata.history import History
+from pjdata.resume import resolve_storage
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+    import pjdata.transformer.transformer as tr
+
+
+def dryrun(data: t.Data, transformers: Iterable[tr.Transformer]) -> List[UUIDData]:
+    """UUIDData objects expected after each transformer (no _transform_impl() is called).
+
+    They have the same uuid, matrix uuids and history as the Data objects a real execution would output.
+    Only the matrices of the input are followed, since the fields added by each transformer are unknown in advance.
+    """
+    uuid, uuids = data.uuid, data.uuids
+    history = History([]) if data.history is None else data.history
+    # Frozen/failed Data objects are only transformed by placeholders, see Data.transformedby().
+    skip = data.isfrozen or data.failure
+    result = []
+    for transformer in transformers:
+        if skip:
+            transformer = transformer.pholder
+        uuid, uuids = li.evolve_id(uuid, uuids, (transformer,), data.matrices)
+        history = history << [transformer]
+        result.append(UUIDData(uuid, uuids, history))
+    return result
+
+
+def report(data: t.Data, transformers: Iterable[tr.Transformer], storage=None) -> List[Dict]:
+    """Which steps of a pipeline would be cache hits in a storage.
+
+    Parameters
+    ----------
+    data
+        Input Data object.
+    transformers
+        Sequence to be applied to the input.
+    storage
+        Storage object or its name in STORAGE_CONFIG["storages"]. Default: data.storage_info.
+
+    Returns
+    -------
+    One dict per step: {"step": index, "transformer": longname, "uuid": uuid id of the output, "hit": stored?}
+    """
+    transformers = list(transformers)
+    storage = resolve_storage(data, storage)
+    return [
+        {"step": i, "transformer": transformer.longname, "uuid": output.uuid.id, "hit": storage.hasdata(output.uuid.id)}
+        for i, (transformer, output) in enumerate(zip(transformers, dryrun(data, transformers)))
+    ]
@@ -1,18 +1,37 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import List, Union
+import heapq
+import weakref
+from functools import lru_cache, partial
+import json
+from typing import Callable, List, Union, Tuple, Dict, Iterable, Iterator, Optional, TYPE_CHECKING
 
 import pjdata.transformer.transformer as tr
+from pjdata.aux.customjsonencoder import CustomJSONEncoder
 from pjdata.aux.util import Property
+from pjdata.aux.uuid import UUID
+from pjdata.config import threadLock
 from pjdata.mixin.printing import withPrinting
 
+if TYPE_CHECKING:
+    import pjdata.types as t
+
 
 class Leaf(withPrinting):
     isleaf = True
+    _len = 1
 
     def __init__(self, transformer: Union[str, tr.Transformer]):
         self.transformer = transformer
+        self._last = transformer
+        self._step = None
+
+    @Property
+    def step(self):
+        """Serializable form of the transformer, memoized (a trie node and its descendants share the same leaf)."""
+        if self._step is None:
+            self._step = _step_jsonable(self.transformer)
+        return self._step
 
     def _jsonable_impl(self):
         return self.transformer.jsonable
@@ -20,16 +39,34 @@ class Leaf(withPrinting):
 
 class History(withPrinting):
     isleaf = False
+    parent: Optional[History] = None  # Only for nodes of the trie, see __lshift__.
 
     def __init__(self, transformers: List[Union[str, tr.Transformer]], nested=None):
-        """Optimized iterable based on structural sharing."""
+        """Optimized iterable based on structural sharing.
+
+        Length and last transformer are known at creation (O(1)).
+        Traversals are iterative, so there is no limit on the depth of the tree (long histories, e.g. AL, DStreams).
+
+        Histories extended through '<<' are nodes of a trie shared by the entire process: identical prefixes
+        (same transformers from the same, or an empty, history) are represented by a single node.
+        """
         self.nested = nested or list(map(Leaf, transformers))
-        # if len(self.nested)==0:
-        #     raise Exception
+        self._len = sum(node._len for node in self.nested)
+        self._last = next((node._last for node in reversed(self.nested) if node._len), None)
+        self._flat = None
+        self._uuid: Optional[UUID] = None
+        self._children: Optional[Dict[tuple, weakref.ref]] = None
 
     @Property
     def last(self):
-        return self._findlast(self)
+        return self._last
+
+    @Property
+    def flat(self) -> Tuple[Union[str, tr.Transformer], ...]:
+        """Flattened version of this history, memoized in this node (only when requested, e.g. by indexing)."""
+        if self._flat is None:
+            self._flat = tuple(self.traverse(self))
+        return self._flat
 
     @lru_cache()
     def _jsonable_impl(self):
@@ -38,34 +75,139 @@ class History(withPrinting):
     def __add__(self, other):
         return History([], nested=[self, other])
 
+    def __reduce__(self):
+        # Trie links are weak references; the unpickled history is a flat one.
+        return History, (list(self),)
+
     def __lshift__(self, transformers):
-        if transformers:
-            return History([], nested=[self, History(transformers)])
-        return self
+        node = _ROOT if self._len == 0 else self
+        for transformer in transformers:
+            node = node._child(transformer)
+        return node if transformers else self
 
-    def traverse(self, node):
-        # TODO: remove recursion due to python conservative limits for longer histories (AL, DStreams, ...)
-        if node.isleaf:
-            yield node.transformer
-        else:
-            for tup in node.nested:
-                yield from self.traverse(tup)
+    def _child(self, transformer: Union[str, tr.Transformer]) -> History:
+        """Trie node for this history followed by the given transformer; created only if it does not exist."""
+        key = _step_key(transformer)
+        with threadLock:
+            if self._children is None:
+                self._children = {}
+            ref = self._children.get(key)
+            child = ref and ref()
+            if child is None:
+                child = History([], nested=[self, Leaf(transformer)])
+                child.parent = self
+                # Weak references: unused nodes are freed along with their last Data object.
+                self._children[key] = weakref.ref(child, partial(_forget, self._children, key))
+            return child
 
-    def _findlast(self, node) -> str:
-        # TODO: remove recursion due to python conservative limits for longer histories (AL, DStreams, ...)
-        if node.isleaf:
-            return node.transformer
-        else:
-            # print(node.nested)
-            return self._findlast(node.nested[-1])
+    def traverse(self, node):
+        """Iterate over the transformers of a node, reusing flattened versions of subtrees when available."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.isleaf:
+                yield node.transformer
+            elif node._flat is not None:
+                yield from node._flat
+            else:
+                stack.extend(reversed(node.nested))
 
     def __iter__(self):
         yield from self.traverse(self)
 
+    def _leaves(self) -> Iterator[Leaf]:
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.isleaf:
+                yield node
+            else:
+                stack.extend(reversed(node.nested))
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, item: Union[int, slice]):
+        """Transformer at a given position or History with the transformers of a slice."""
+        if isinstance(item, slice):
+            return History(list(self.flat[item]))
+        if item == -1 or item == self._len - 1:
+            if self._len == 0:
+                raise IndexError("History index out of range")
+            return self._last
+        return self.flat[item]
+
     @Property
-    def pickable(self):
-        """Convert history to a serializable list."""
-        return [transformer.jsonable for transformer in self]
+    def pickable(self) -> list:
+        """Convert history to a serializable list.
+
+        Only the serialized steps are memoized (in the leaves), so memory is linear in the number of distinct steps.
+        See compact() to avoid sending the steps of a known prefix."""
+        return [leaf.step for leaf in self._leaves()]
+
+    @Property
+    def uuid(self) -> UUID:
+        """Identity of the serialized content of this history, see compact()."""
+        if self._uuid is None:
+            node, steps = self, []
+            while node.parent is not None and node._uuid is None:
+                steps.append(node)
+                node = node.parent
+            if node._uuid is None:
+                node._uuid = pickable_uuid(node.pickable)
+            for child in reversed(steps):
+                child._uuid = child.parent._uuid * _step_uuid(child.nested[1].step)
+        return self._uuid
+
+    def compact(self, known: Optional[Iterable[str]] = None) -> dict:
+        """Serializable form that references a prefix of this history instead of including its steps.
+
+        Parameters
+        ----------
+        known
+            Ids of the uuids of histories already available to the receiver (e.g. stored along previous Data objects).
+            The longest one that is a proper prefix of this history is referenced.
+            Default: the parent node, i.e. only the last step is encoded.
+
+        Returns
+        -------
+        {"prefix": uuid id of the referenced history or None, "steps": serialized steps after the prefix}
+        """
+        if self.parent is None:
+            return {"prefix": None, "steps": self.pickable}
+        known = {self.parent.uuid.id} if known is None else set(known)
+        node, leaves = self.parent, [self.nested[1]]
+        while node.parent is not None and node.uuid.id not in known:
+            leaves.append(node.nested[1])
+            node = node.parent
+        steps = [leaf.step for leaf in reversed(leaves)]
+        if node._len == 0:
+            return {"prefix": None, "steps": steps}
+        if node.uuid.id not in known:
+            # Untracked beginning, e.g. the history of Data objects created by '+'.
+            return {"prefix": None, "steps": node.pickable + steps}
+        return {"prefix": node.uuid.id, "steps": steps}
+
+    @staticmethod
+    def expand(compact: dict, resolve: Callable[[str], Union[dict, list]]) -> list:
+        """Rebuild the serializable list (like 'pickable') from a compact form, see compact().
+
+        Parameters
+        ----------
+        compact
+            Output of compact().
+        resolve
+            Provides the compact form (or the full list) of a history given its uuid id, e.g. a storage lookup.
+        """
+        chunks = []
+        while isinstance(compact, dict):
+            chunks.append(compact["steps"])
+            if compact["prefix"] is None:
+                break
+            compact = resolve(compact["prefix"])
+        else:
+            chunks.append(compact)
+        return [step for chunk in reversed(chunks) for step in chunk]
 
     @Property
     def clean(self):
@@ -76,3 +218,89 @@ class History(withPrinting):
 
     def __xor__(self, attrname):
         return list(map(lambda x: x.__dict__[attrname], self.traverse(self)))  # TODO: memoize json?
+
+
+def _forget(children: Dict[tuple, weakref.ref], key: tuple, ref: weakref.ref):
+    """Remove the entry of a freed trie node, unless it was already replaced by a new node."""
+    # Called by the garbage collector, possibly while this thread holds the lock: never wait for it.
+    # If it is busy, the dead entry is left behind and replaced at the next request for the same key.
+    if threadLock.acquire(blocking=False):
+        try:
+            if children.get(key) is ref:
+                del children[key]
+        finally:
+            threadLock.release()
+
+
+def _step_key(transformer: Union[str, tr.Transformer]) -> tuple:
+    # UUID is not enough: all PHolders have the identity UUID.
+    if isinstance(transformer, str):
+        return (transformer,)
+    return transformer.__class__, transformer.uuid, transformer.serialized_component
+
+
+def _step_jsonable(transformer: Union[str, tr.Transformer]):
+    return transformer if isinstance(transformer, str) else transformer.jsonable
+
+
+def _step_uuid(step) -> UUID:
+    # Based on the serialized step (not only on transformer.uuid, which is the identity for all PHolders).
+    return UUID(json.dumps(step, cls=CustomJSONEncoder, sort_keys=True).encode())
+
+
+def pickable_uuid(pickable: list) -> UUID:
+    """UUID of a serialized history (e.g. Data.historystr), equal to the uuid of the History it came from."""
+    uuid = UUID.identity
+    for step in pickable:
+        uuid = uuid * _step_uuid(step)
+    return uuid
+
+
+_ROOT = History([])
+
+
+def longest_common_prefix(h1: History, h2: History) -> History:
+    """Longest history that is a prefix of both histories."""
+    if _top(h1) is _ROOT and _top(h2) is _ROOT:
+        while h1._len > h2._len:
+            h1 = h1.parent
+        while h2._len > h1._len:
+            h2 = h2.parent
+        while h1 is not h2:
+            h1, h2 = h1.parent, h2.parent
+        return h1
+
+    # Histories built otherwise (e.g. '+', or '<<' from a history not in the trie) are compared step by step.
+    common = []
+    for a, b in zip(h1, h2):
+        if a is not b and _step_key(a) != _step_key(b):
+            break
+        common.append(a)
+    return _ROOT << common
+
+
+def data_counts(datas: Iterable[t.Data]) -> Dict[History, int]:
+    """Number of Data objects whose history starts with each node of the trie (i.e. each prefix)."""
+    counts: Dict[History, int] = {}
+    for data in datas:
+        counts[data.history] = counts.get(data.history, 0) + 1
+
+    # Deepest nodes first, so that each count is complete before being added to its parent.
+    heap = [(-len(node), id(node), node) for node in counts]
+    heapq.heapify(heap)
+    while heap:
+        _, _, node = heapq.heappop(heap)
+        parent = node.parent
+        if parent is not None:
+            if parent not in counts:
+                counts[parent] = 0
+                heapq.heappush(heap, (-len(parent), id(parent), parent))
+            counts[parent] += counts[node]
+    return counts
+
+
+def _top(history: History) -> History:
+    """First node of the trie branch of a history, i.e. _ROOT for histories built by '<<' from an empty one."""
+    while history.parent is not None:
+        history = history.parent
+    return history
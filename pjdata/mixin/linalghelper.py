@@ -8,6 +8,9 @@ if t.TYPE_CHECKING:
     import pjdata.types as t
 
 import pjdata.aux.uuid as u
+from pjdata.aux.chunked import ChunkedMatrix
+from pjdata.aux.compression import pack
+from pjdata.aux.sharedmemory import SharedMatrix
 import pjdata.transformer.transformer as tr
 
 
@@ -25,6 +28,8 @@ def _as_column_vector(vec: ndarray) -> ndarray:
 
 
 def mat2vec(m: ndarray, default: ndarray = None) -> ndarray:
+    if isinstance(m, ChunkedMatrix):
+        m = m.concatenate()
     return default if m is None else _as_vector(m)
 
 
@@ -43,6 +48,10 @@ def field_as_matrix(field_value: "t.Field") -> "t.Field":
     if isinstance(field_value, ndarray) and len(field_value.shape) == 1:
         return _as_column_vector(field_value)
 
+    # Row blocks, possibly out-of-core, or matrix in shared memory.
+    if isinstance(field_value, (ChunkedMatrix, SharedMatrix)):
+        return field_value
+
     # Scalar.
     if isinstance(field_value, int):
         return np.array(field_value, ndmin=2)
@@ -65,6 +74,15 @@ def fields2matrices(fields: Dict[str, "t.Field"]) -> Dict[str, "t.Field"]:
     return matrices
 
 
+def matrix_uuid(value: "t.Field") -> u.UUID:
+    """UUID of the content of a matrix at its birth.
+
+    For a ChunkedMatrix, it is the product of the UUIDs of its chunks, so the whole matrix is never packed at once."""
+    if isinstance(value, ChunkedMatrix):
+        return value.uuid
+    return u.UUID(pack(value))
+
+
 def evolve(uuid: u.UUID, transformers: t.Iterable[tr.Transformer]) -> u.UUID:
     for transformer in transformers:
         uuid *= transformer.uuid
@@ -99,7 +117,11 @@ def evolve_id(
         #   a desvantagem é não ter o início da matriz compatível com o início em File,
         #   mas talvez possamos mudar File pra ficar igual.
 
-        muuid = uuids.get(name, uuid * u.UUID(bytes(name, "latin1")))  # <-- fallback value
+        muuid = uuids.get(name)
+        if muuid is None and isinstance(value, ChunkedMatrix):
+            muuid = matrix_uuid(value)  # Cheap when the chunk UUIDs are known, e.g. after unpack().
+        if muuid is None:
+            muuid = uuid * u.UUID(bytes(name, "latin1"))  # <-- fallback value (calculated only when needed)
 
         # Transform UUID.
         muuid = evolve(muuid, transformers)
@@ -0,0 +1,82 @@
+"""Execution of many pipelines at once, computing each distinct step only once.
+
+Identical prefixes of sequences of transformers applied to identical inputs (e.g. pipelines sampled by a random
+search) are merged into a single node of a DAG (actually a forest, rooted at the input Data objects).
+Steps are identified as in the history trie (see pjdata.history), not only by the UUID they lead to:
+e.g. all PHolders have the identity UUID, yet each one is a step of the history.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from pjdata.history import _step_key
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+    import pjdata.transformer.transformer as tr
+
+
+class _Node:
+    __slots__ = ("transformer", "children", "pending", "result", "target")
+
+    def __init__(self, transformer: Optional[tr.Transformer]):
+        self.transformer = transformer
+        self.children: List[_Node] = []
+        self.pending = 0  # Children not computed yet.
+        self.result: Optional[t.Data] = None
+        self.target = False  # Output of a job, i.e. kept until the end.
+
+
+class Plan:
+    """Merge jobs (Data object, sequence of transformers) into a DAG of unique computations.
+
+    Usage: Plan(jobs).run() returns the same Data objects as applying each sequence to each Data object.
+    """
+
+    def __init__(self, jobs: Sequence[Tuple[t.Data, Sequence[tr.Transformer]]]):
+        self.total = 0  # Number of steps of all jobs.
+        self._nodes: Dict[tuple, _Node] = {}  # Key: (id of the parent node, step key), or (data uuid id,).
+        self._roots: List[_Node] = []
+        self._outputs: List[_Node] = []
+        for data, transformers in jobs:
+            key: tuple = (data.uuid.id,)
+            if key not in self._nodes:
+                root = self._nodes[key] = _Node(None)
+                root.result = data
+                self._roots.append(root)
+            node = self._nodes[key]
+            for transformer in transformers:
+                key = id(node), _step_key(transformer)
+                if key not in self._nodes:
+                    child = self._nodes[key] = _Node(transformer)
+                    node.children.append(child)
+                    node.pending += 1
+                node = self._nodes[key]
+                self.total += 1
+            node.target = True
+            self._outputs.append(node)
+
+    @property
+    def unique(self) -> int:
+        """Number of distinct steps, i.e. of transformations actually executed by run()."""
+        return len(self._nodes) - len(self._roots)
+
+    def run(self, exit_on_error=True) -> List[t.Data]:
+        """Execute each distinct step once (depth-first) and return the output of each job, in the original order.
+
+        Intermediate results are released as soon as all steps depending on them are done."""
+        for root in self._roots:
+            stack = [(root, child) for child in reversed(root.children)]
+            while stack:
+                parent, node = stack.pop()
+                node.result = node.transformer.transform(parent.result, exit_on_error=exit_on_error)
+                parent.pending -= 1
+                if parent.pending == 0 and not parent.target:
+                    parent.result = None
+                stack.extend((node, child) for child in reversed(node.children))
+        return [node.result for node in self._outputs]
+
+
+def run(jobs: Sequence[Tuple[t.Data, Sequence[tr.Transformer]]], exit_on_error=True) -> List[t.Data]:
+    """Shortcut for Plan(jobs).run()."""
+    return Plan(jobs).run(exit_on_error)
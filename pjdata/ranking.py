@@ -0,0 +1,94 @@
+"""Vectorized comparison of many Data objects (e.g. results of candidate pipelines), see also Data.__lt__."""
+from __future__ import annotations
+
+from typing import List, Literal, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+
+
+def rank(
+        datas: Sequence[t.Data], target: Optional[str] = None, frozen: Literal["last", "rank"] = "last"
+) -> List[t.Data]:
+    """Sort Data objects from the best to the worst, like sorted(datas, reverse=True) but much faster.
+
+    'A > B' means A is better than B (see Data.__lt__): the first available target field is compared,
+    and multi-valued fields are compared lexicographically.
+
+    Parameters
+    ----------
+    datas
+        Data objects to compare.
+    target
+        Fields precedence, e.g. "s,r". Default: the target of the first Data object.
+        The first field provided by at least one Data object is used for all of them.
+    frozen
+        'last' puts frozen Data objects at the end. 'rank' compares their (unsafe) fields as usual.
+        Failed/hollow Data objects and those missing the field are always at the end, in the original order.
+
+    Returns
+    -------
+    List of Data objects.
+    """
+    keys, valid, rest = _keys(datas, target, frozen)
+    order = np.lexsort(-keys.T[::-1]) if len(valid) else []
+    return [datas[valid[i]] for i in order] + [datas[i] for i in rest]
+
+
+def top_k(
+        datas: Sequence[t.Data], k: int, target: Optional[str] = None, frozen: Literal["last", "rank"] = "last"
+) -> List[t.Data]:
+    """The k best Data objects, from the best. See rank().
+
+    Only the k best are sorted (partition), when a single value is compared.
+    Ties are broken as in rank(), i.e. by the original order."""
+    if k < 0:
+        raise Exception(f"Expecting a non-negative k, not {k}.")
+    keys, valid, rest = _keys(datas, target, frozen)
+    if 0 < k < len(valid) and keys.shape[1] == 1:
+        values = -keys[:, 0]
+        kth = np.partition(values, k - 1)[k - 1]
+        # All values better than the k-th one, completed by the first ones equal to it.
+        # A NaN k-th value means fewer than k numbers: all of them are better, NaNs complete (as in rank()).
+        better = np.flatnonzero(~np.isnan(values) if np.isnan(kth) else values < kth)
+        ties = np.flatnonzero(np.isnan(values) if np.isnan(kth) else values == kth)[:k - len(better)]
+        candidates = np.concatenate([better, ties])
+        order = candidates[np.lexsort((candidates, values[candidates]))]
+    else:
+        order = np.lexsort(-keys.T[::-1])[:k] if len(valid) else []
+    return ([datas[valid[i]] for i in order] + [datas[i] for i in rest])[:k]
+
+
+def _keys(datas: Sequence[t.Data], target: Optional[str], frozen: str) -> Tuple[np.ndarray, List[int], List[int]]:
+    """Gather the compared values of all Data objects at once.
+
+    Returns
+    -------
+    (matrix with one row of values per rankable Data, their indexes, indexes of the other Data objects)
+    """
+    if frozen not in ["last", "rank"]:
+        raise Exception(f"Unknown option for frozen Data: {frozen}. Options: last, rank.")
+    if not datas:
+        return np.empty((0, 1)), [], []
+    names = target.split(",") if target else datas[0].target
+    name = next((name for name in names if any(name.upper() in data.matrices for data in datas)), None)
+    if name is None:
+        raise Exception("Impossible to make comparisons. None of the target fields are available:", names)
+
+    values, valid, rest = [], [], []
+    for i, data in enumerate(datas):
+        if data.failure or data.ishollow or (data.isfrozen and frozen == "last") or name.upper() not in data.matrices:
+            rest.append(i)
+            continue
+        value = data.field("unsafe" + name if data.isfrozen else name, context="ranking of Data objects")
+        values.append(np.asarray(value, dtype=float).reshape(-1))
+        valid.append(i)
+
+    if not valid:
+        return np.empty((0, 1)), valid, rest
+    sizes = {len(v) for v in values}
+    if len(sizes) > 1:
+        raise Exception(f"Field {name} has different sizes among Data objects: {sorted(sizes)}")
+    return np.vstack(values), valid, rest
@@ -0,0 +1,104 @@
+"""Resumption of pipelines from the deepest intermediate result already stored.
+
+The UUID of every intermediate Data object is known before running anything (data.uuid * transformer.uuid * ...),
+so a storage can be queried in advance and the repeated work (e.g. after a crash, or a shared prefix) is skipped.
+
+Storages are expected to provide hasdata(id), fetch(hollow_data) and store(data), see pjdata.storage.memory.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Tuple, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+    import pjdata.transformer.transformer as tr
+
+
+def hollows(data: t.Data, transformers: Iterable[tr.Transformer]) -> List[t.Data]:
+    """Hollow Data objects expected after each transformer, preceded by the given Data object."""
+    result = [data]
+    for transformer in transformers:
+        result.append(result[-1].hollow(transformer))
+    return result
+
+
+def cached_prefix(
+        data: t.Data, transformers: Iterable[tr.Transformer], storage=None
+) -> Tuple[int, Optional[t.Data]]:
+    """Find the deepest intermediate result already stored.
+
+    Parameters
+    ----------
+    data
+        Input Data object.
+    transformers
+        Sequence to be applied to the input.
+    storage
+        Storage object or its name in STORAGE_CONFIG["storages"]. Default: data.storage_info.
+
+    Returns
+    -------
+    (number of transformers already applied to the stored Data object, stored Data object or None)
+    """
+    transformers = list(transformers)
+    # Frozen/failed Data objects are only transformed by placeholders, i.e. there is nothing to skip.
+    if data.isfrozen or data.failure or not transformers:
+        return 0, None
+    storage = resolve_storage(data, storage)
+    expected = hollows(data, transformers)
+    for k in range(len(transformers), 0, -1):
+        if storage.hasdata(expected[k].uuid.id):
+            fetched = storage.fetch(expected[k])
+            if fetched is not None:
+                return k, fetched
+    return 0, None
+
+
+def resume(
+        data: t.Data, transformers: Iterable[tr.Transformer], storage=None, store: bool = True, exit_on_error=True
+) -> t.Data:
+    """Apply a sequence of transformers, starting from the deepest intermediate result already stored.
+
+    Parameters
+    ----------
+    data
+        Input Data object.
+    transformers
+        Sequence to be applied to the input.
+    storage
+        Storage object or its name in STORAGE_CONFIG["storages"]. Default: data.storage_info.
+    store
+        Whether to store each new intermediate result, so that a further run can resume from it.
+    exit_on_error
+        See Transformer.transform().
+
+    Returns
+    -------
+    The same Data object as obtained by applying all transformers.
+    """
+    transformers = list(transformers)
+    storage = resolve_storage(data, storage)
+    k, result = cached_prefix(data, transformers, storage)
+    if result is None:
+        result = data
+    elif len(result.history) == 0:
+        # Storages usually keep only historystr.
+        result.history = data.history << transformers[:k]
+    for transformer in transformers[k:]:
+        result = transformer.transform(result, exit_on_error=exit_on_error)
+        if store:
+            storage.store(result)
+    return result
+
+
+def resolve_storage(data: t.Data, storage: Union[str, object, None]):
+    """Storage object given itself, its name (see pjdata.storage.storage.get_storage) or None (data.storage_info)."""
+    if storage is None:
+        storage = data.storage_info
+    if storage is None:
+        raise Exception("Storage not set! Unable to look for stored results of", data.uuid.id)
+    if isinstance(storage, str):
+        from pjdata.storage.storage import get_storage
+
+        storage = get_storage(storage)
+    return storage
@@ -0,0 +1,112 @@
+"""Local content-addressed storage of Data objects and matrices, keyed by UUID.
+
+Layout (<xx> = last two hex digits of the UUID, to spread files among directories):
+    <path>/matrices/<xx>/<hex of the matrix uuid>.pack   (pack() format)
+    <path>/matrices/<xx>/<hex of the matrix uuid>.npy    (numeric matrices, when mmap=True)
+    <path>/data/<xx>/<hex of the data uuid>.json          (uuids, history uuid, flags and matrix names)
+    <path>/histories/<xx>/<hex of the history uuid>.json  (compact form, see History.compact)
+
+Files are written atomically (temporary file + rename) and never rewritten, since their names identify their content;
+so many processes can share the same directory.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np  # type: ignore
+
+from pjdata.aux.cache import filename, write_atomically
+from pjdata.aux.compression import iterpack, unpack
+from pjdata.aux.serialization import serialize
+from pjdata.storage.storage import Storage
+
+
+class DiskStorage(Storage):
+    """Directory-based storage, see Storage.
+
+    Parameters
+    ----------
+    path
+        Root directory.
+    mmap
+        Store numeric matrices as uncompressed .npy files and fetch them as read-only memory maps
+        (pages are loaded only when touched). Otherwise, matrices are compressed in pack() format.
+    name
+        See Storage.
+    """
+
+    def __init__(self, path: str, mmap: bool = False, name: Optional[str] = None):
+        super().__init__(name)
+        self.path = path
+        self.mmap = mmap
+
+    def hasdata(self, id: str) -> bool:
+        return os.path.exists(self._file("data", id, ".json"))
+
+    def hasmatrix(self, id: str) -> bool:
+        return os.path.exists(self._file("matrices", id, ".pack")) or os.path.exists(self._file("matrices", id, ".npy"))
+
+    def missing_matrices(self, ids: Iterable[str]) -> List[str]:
+        return [id for id in ids if not self.hasmatrix(id)]
+
+    def store_matrices(self, matrices: Dict[str, object]):
+        for id, m in matrices.items():
+            if self.hasmatrix(id):
+                continue
+            if self.mmap and isinstance(m, np.ndarray) and not m.dtype.hasobject:
+                write_atomically(self._file("matrices", id, ".npy"), partial(np.save, arr=m, allow_pickle=False))
+            else:
+                write_atomically(self._file("matrices", id, ".pack"), iterpack(m))
+
+    def fetch_matrices(self, ids: Iterable[str]) -> Dict[str, object]:
+        return {id: self.fetch_matrix(id) for id in ids}
+
+    def fetch_matrix(self, id: str):
+        npy = self._file("matrices", id, ".npy")
+        if os.path.exists(npy):
+            return np.load(npy, mmap_mode="r")
+        try:
+            with open(self._file("matrices", id, ".pack"), "rb") as f:
+                if f.read(1) != b"C":
+                    f.seek(0)
+                    return unpack(f.read())
+                # Chunks are decompressed from the memory-mapped file only when accessed.
+                return unpack(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except FileNotFoundError:
+            raise Exception(f"Matrix {id} not found in {self.path}!")
+
+    def missing_histories(self, ids: Iterable[str]) -> List[str]:
+        return [id for id in ids if not os.path.exists(self._file("histories", id, ".json"))]
+
+    def store_histories(self, compacts: Dict[str, dict]):
+        for id, compact in compacts.items():
+            write_atomically(self._file("histories", id, ".json"), serialize(compact).encode())
+
+    def fetch_histories(self, ids: Iterable[str]) -> Dict[str, dict]:
+        return self._read_json("histories", ids)
+
+    def _store_metadata_impl(self, metas):
+        for meta in metas:
+            write_atomically(self._file("data", meta["uuid"], ".json"), serialize(meta).encode())
+
+    def _fetch_metadata_impl(self, ids):
+        return list(self._read_json("data", ids).values())
+
+    def _read_json(self, kind: str, ids: Iterable[str]) -> Dict[str, dict]:
+        """Content of the existing JSON files of the given kind and ids."""
+        dic = {}
+        for id in ids:
+            try:
+                with open(self._file(kind, id, ".json")) as f:
+                    dic[id] = json.load(f)
+            except FileNotFoundError:
+                pass
+        return dic
+
+    def _file(self, kind: str, id: str, extension: str) -> str:
+        name = filename(id)
+        return os.path.join(self.path, kind, name[-2:], name + extension)
@@ -0,0 +1,46 @@
+"""In-process storage of Data objects, keyed by UUID. Useful as a local stand-in for real storages (e.g. in tests)."""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, TYPE_CHECKING
+
+import pjdata.aux.uuid as u
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+
+
+class MemoryStorage:
+    """Keep Data objects (and their matrices) by reference, i.e. nothing is copied or serialized.
+
+    Register it in STORAGE_CONFIG["storages"] under a name to be used as 'storage_info' of Data objects.
+    """
+
+    def __init__(self):
+        self._datas: Dict[str, t.Data] = {}
+        self._matrices: Dict[str, object] = {}
+
+    def store(self, data: t.Data):
+        """Keep a Data object, replacing any other with the same UUID. Matrices in shared memory are copied."""
+        data = data.unshared()
+        self._datas[data.uuid.id] = data
+        for name, m in data.matrices.items():
+            if name in data.uuids and not callable(m) and not isinstance(m, u.UUID):
+                self._matrices[data.uuids[name].id] = m
+
+    def hasdata(self, id: str) -> bool:
+        return id in self._datas
+
+    def fetch(self, hollow: t.Data) -> Optional[t.Data]:
+        """Data object with the same UUID as the given (hollow) one, or None if absent."""
+        return self._datas.get(hollow.uuid.id)
+
+    def fetch_matrix(self, id: str):
+        if id not in self._matrices:
+            raise Exception(f"Matrix {id} not found!")
+        return self._matrices[id]
+
+    def ids(self) -> Iterable[str]:
+        return self._datas.keys()
+
+    def __len__(self):
+        return len(self._datas)
@@ -0,0 +1,167 @@
+"""SQLite storage of Data objects and matrices (engine 'sqlite' in STORAGE_CONFIG), see Storage.
+
+Tables:
+    data(uuid, ids_str, matrix_names_str, history_id, failure, frozen, hollow, target)
+    matrices(id, blob)  -- pack() format, stored once per matrix uuid
+    histories(id, compact_json)  -- see History.compact, stored once per history uuid
+"""
+from __future__ import annotations
+
+import json
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pjdata.aux.compression import pack, unpack
+from pjdata.aux.serialization import serialize
+from pjdata.storage.storage import Storage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data (
+    uuid TEXT PRIMARY KEY, ids_str TEXT NOT NULL, matrix_names_str TEXT NOT NULL, history_id TEXT NOT NULL,
+    failure TEXT, frozen INTEGER NOT NULL, hollow INTEGER NOT NULL, target TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS matrices (id TEXT PRIMARY KEY, blob BLOB NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS histories (id TEXT PRIMARY KEY, compact_json TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+
+class SQLiteStorage(Storage):
+    """SQLite database file in WAL mode (concurrent readers with one writer), see Storage.
+
+    Parameters
+    ----------
+    file
+        Database file, created if needed.
+    pool_size
+        Maximum number of connections; each one is used by one thread at a time.
+    batch_size
+        Number of ids per query when fetching/checking many rows. Every query has the same number of parameters
+        (the last batch is padded), so the statement compiled by each connection is reused.
+    name
+        See Storage.
+    """
+
+    def __init__(self, file: str, pool_size: int = 4, batch_size: int = 500, name: Optional[str] = None):
+        super().__init__(name)
+        self.file = file
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def hasdata(self, id: str) -> bool:
+        with self._connection() as conn:
+            return conn.execute("SELECT 1 FROM data WHERE uuid = ?", (id,)).fetchone() is not None
+
+    def missing_matrices(self, ids: Iterable[str]) -> List[str]:
+        ids = list(dict.fromkeys(ids))
+        found = {row[0] for row in self._select("SELECT id FROM matrices WHERE id IN ({})", ids)}
+        return [id for id in ids if id not in found]
+
+    def store_matrices(self, matrices: Dict[str, object]):
+        rows = [(id, pack(m)) for id, m in matrices.items()]
+        with self._connection() as conn, conn:
+            conn.executemany("INSERT OR IGNORE INTO matrices (id, blob) VALUES (?, ?)", rows)
+
+    def fetch_matrices(self, ids: Iterable[str]) -> Dict[str, object]:
+        ids = list(dict.fromkeys(ids))
+        rows = self._select("SELECT id, blob FROM matrices WHERE id IN ({})", ids)
+        matrices = {id: unpack(blob) for id, blob in rows}
+        missing = [id for id in ids if id not in matrices]
+        if missing:
+            raise Exception(f"Matrices not found in {self.file}: {missing}")
+        return matrices
+
+    def missing_histories(self, ids: Iterable[str]) -> List[str]:
+        ids = list(dict.fromkeys(ids))
+        found = {row[0] for row in self._select("SELECT id FROM histories WHERE id IN ({})", ids)}
+        return [id for id in ids if id not in found]
+
+    def store_histories(self, compacts: Dict[str, dict]):
+        rows = [(id, serialize(compact)) for id, compact in compacts.items()]
+        with self._connection() as conn, conn:
+            conn.executemany("INSERT OR IGNORE INTO histories (id, compact_json) VALUES (?, ?)", rows)
+
+    def fetch_histories(self, ids: Iterable[str]) -> Dict[str, dict]:
+        rows = self._select("SELECT id, compact_json FROM histories WHERE id IN ({})", list(ids))
+        return {id: json.loads(compact_json) for id, compact_json in rows}
+
+    def _store_metadata_impl(self, metas):
+        rows = [
+            (
+                meta["uuid"], ",".join(meta["uuids"].values()), ",".join(meta["uuids"].keys()),
+                meta["history"], meta["failure"], meta["frozen"], meta["hollow"], ",".join(meta["target"])
+            )
+            for meta in metas
+        ]
+        with self._connection() as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO data VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def _fetch_metadata_impl(self, ids):
+        metas = []
+        sql = (
+            "SELECT uuid, ids_str, matrix_names_str, history_id, failure, frozen, hollow, target "
+            "FROM data WHERE uuid IN ({})"
+        )
+        for uuid, ids_str, names_str, history_id, failure, frozen, hollow, target in self._select(sql, ids):
+            names, mids = names_str.split(",") if names_str else [], ids_str.split(",") if ids_str else []
+            metas.append({
+                "uuid": uuid,
+                "uuids": dict(zip(names, mids)),
+                "history": history_id,
+                "failure": failure,
+                "frozen": bool(frozen),
+                "hollow": bool(hollow),
+                "target": target.split(","),
+            })
+        return metas
+
+    def _select(self, sql: str, ids: List[str]) -> Iterator[tuple]:
+        """Run a query whose placeholders ({}) receive the ids in batches of fixed size."""
+        if not ids:
+            return
+        sql = sql.format(",".join("?" * self.batch_size))
+        with self._connection() as conn:
+            for i in range(0, len(ids), self.batch_size):
+                batch = ids[i:i + self.batch_size]
+                batch += [batch[0]] * (self.batch_size - len(batch))  # Padding; duplicates do not add rows.
+                yield from conn.execute(sql, batch)
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection from the pool, creating it if the pool is not full yet."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections move among threads, but each one is used by a single thread at a time.
+        conn = sqlite3.connect(self.file, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def close(self):
+        """Close the idle connections."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
@@ -0,0 +1,198 @@
+"""Base class of persistent storages of Data objects and matrices, keyed by UUID (see also pjdata.resume)."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Union, TYPE_CHECKING
+
+import pjdata.aux.uuid as u
+from pjdata.aux.sharedmemory import SharedMatrix
+from pjdata.config import STORAGE_CONFIG, threadLock
+from pjdata.history import History, pickable_uuid
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+
+
+class Storage(ABC):
+    """Storage protocol (hasdata, fetch, store, fetch_matrix) plus batch versions.
+
+    Data objects are kept as metadata: {"uuid", "uuids": {matrix name: uuid id}, "history": history uuid id,
+    "failure", "frozen", "hollow", "target"}; matrices are kept once per uuid.
+    Histories are kept once per uuid in compact form (see History.compact): only the steps after the longest prefix
+    already stored are written, so storing each step of a pipeline does not rewrite the whole history every time.
+
+    Parameters
+    ----------
+    name
+        Name under which this storage is registered in STORAGE_CONFIG["storages"], if any.
+        When registered, fetched Data objects are lazy: each matrix is only read at the first access to its field.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self.name = name
+
+    def store(self, data: t.Data):
+        """Store a Data object and the matrices not yet stored (by uuid).
+
+        Deferred fields are resolved and matrices in shared memory are copied."""
+        self.store_many([data])
+
+    def store_many(self, datas: Iterable[t.Data]):
+        """Store many Data objects at once, see store()."""
+        datas = list(datas)
+        sources = {}
+        for data in datas:
+            for name in data.matrices:
+                sources.setdefault(data.uuids[name].id, (data, name))
+        matrices = {}
+        for id in self.missing_matrices(sources.keys()):
+            data, name = sources[id]
+            m = data.matrices[name]
+            if isinstance(m, SharedMatrix):
+                m = m.copy()  # The handle would dangle once its block is freed.
+            elif callable(m) or isinstance(m, u.UUID):
+                m = data.field("unsafe" + name)
+            matrices[id] = m
+        self.store_matrices(matrices)
+        self.store_histories(self._compact_histories(datas))
+        self._store_metadata_impl([_metadata(data) for data in datas])
+
+    def fetch(self, hollow: t.Data, lazy: Optional[bool] = None) -> Optional[t.Data]:
+        """Data object with the same UUID as the given (hollow) one, or None if absent.
+
+        'lazy' defaults to whether this storage is registered under its name in STORAGE_CONFIG["storages"]."""
+        return self.fetch_many([hollow.uuid.id], lazy).get(hollow.uuid.id)
+
+    def fetch_many(self, ids: Iterable[str], lazy: Optional[bool] = None) -> Dict[str, t.Data]:
+        """Data objects given their uuid ids (absent ones are omitted), see fetch()."""
+        metas = self._fetch_metadata_impl(list(ids))
+        if lazy is None:
+            lazy = self.name is not None and STORAGE_CONFIG["storages"].get(self.name) is self
+        fetched = {} if lazy else self.fetch_matrices({id for meta in metas for id in meta["uuids"].values()})
+        histories = self._expand_histories({meta["history"] for meta in metas})
+        return {meta["uuid"]: self._rebuild(meta, fetched, histories[meta["history"]], lazy) for meta in metas}
+
+    def fetch_matrix(self, id: str):
+        return self.fetch_matrices([id])[id]
+
+    @abstractmethod
+    def hasdata(self, id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def missing_matrices(self, ids: Iterable[str]) -> List[str]:
+        """Which of the given matrix uuid ids are not stored yet."""
+
+    @abstractmethod
+    def store_matrices(self, matrices: Dict[str, object]):
+        """Store many matrices at once, given by uuid id. Those already stored are skipped."""
+
+    @abstractmethod
+    def fetch_matrices(self, ids: Iterable[str]) -> Dict[str, object]:
+        """Fetch many matrices at once, given by uuid id."""
+
+    @abstractmethod
+    def missing_histories(self, ids: Iterable[str]) -> List[str]:
+        """Which of the given history uuid ids are not stored yet."""
+
+    @abstractmethod
+    def store_histories(self, compacts: Dict[str, dict]):
+        """Store many histories at once, given by uuid id, in compact form."""
+
+    @abstractmethod
+    def fetch_histories(self, ids: Iterable[str]) -> Dict[str, dict]:
+        """Compact forms of the given history uuid ids (absent ones are omitted)."""
+
+    @abstractmethod
+    def _store_metadata_impl(self, metas: List[dict]):
+        pass
+
+    @abstractmethod
+    def _fetch_metadata_impl(self, ids: List[str]) -> List[dict]:
+        """Metadata of the given Data uuid ids (absent ones are omitted)."""
+
+    def _compact_histories(self, datas: List[t.Data]) -> Dict[str, dict]:
+        """Compact forms of the histories not yet stored, referencing stored prefixes (or those in the same batch)."""
+        histories: Dict[str, Union[History, list]] = {}
+        for data in datas:
+            if data.history is not None and len(data.history):
+                histories.setdefault(data.history.uuid.id, data.history)
+            else:
+                histories.setdefault(pickable_uuid(data.historystr).id, data.historystr)
+        parents = [h.parent.uuid.id for h in histories.values() if isinstance(h, History) and h.parent is not None]
+        missing = set(self.missing_histories(list(histories) + parents))
+        known = set(histories).union(id for id in parents if id not in missing)
+        return {
+            id: h.compact(known) if isinstance(h, History) else {"prefix": None, "steps": list(h)}
+            for id, h in histories.items()
+            if id in missing
+        }
+
+    def _expand_histories(self, ids: Iterable[str]) -> Dict[str, list]:
+        """Serializable lists of the given histories; referenced prefixes are fetched level by level."""
+        ids, compacts = list(ids), {}
+        pending = set(ids)
+        while pending:
+            found = self.fetch_histories(pending)
+            if len(found) < len(pending):
+                raise Exception(f"Histories not found in storage: {sorted(pending.difference(found))}")
+            compacts.update(found)
+            pending = {c["prefix"] for c in found.values() if c["prefix"] is not None}.difference(compacts)
+        return {id: History.expand(compacts[id], compacts.__getitem__) for id in ids}
+
+    def _rebuild(self, meta: dict, fetched: Dict[str, object], historystr: list, lazy: bool) -> t.Data:
+        from pjdata.content.data import Data
+
+        uuids = {name: u.UUID(id) for name, id in meta["uuids"].items()}
+        if lazy:
+            matrices = uuids.copy()  # Placeholders, see Data.field().
+        else:
+            matrices = {name: fetched[id] for name, id in meta["uuids"].items()}
+        return Data(
+            uuid=u.UUID(meta["uuid"]),
+            uuids=uuids,
+            history=History([]),
+            failure=meta["failure"],
+            frozen=meta["frozen"],
+            hollow=meta["hollow"],
+            stream=None,
+            target=",".join(meta["target"]),
+            storage_info=self.name if lazy else None,
+            historystr=historystr,
+            **matrices,
+        )
+
+
+def get_storage(name: str):
+    """Storage registered under the given name in STORAGE_CONFIG["storages"].
+
+    STORAGE_CONFIG entries with engine 'sqlite' (e.g. "default_sqlite") are registered at their first use.
+    Their database file must be given explicitly by the key 'file'."""
+    storages = STORAGE_CONFIG["storages"]
+    if name not in storages:
+        config = STORAGE_CONFIG.get(name)
+        if isinstance(config, dict) and config.get("engine") == "sqlite":
+            if "file" not in config:
+                raise Exception(f"Missing database file for storage {name}: set STORAGE_CONFIG[{name!r}]['file'].")
+            from pjdata.storage.sqlite import SQLiteStorage
+
+            with threadLock:
+                if name not in storages:
+                    storages[name] = SQLiteStorage(config["file"], name=name)
+    if name not in storages:
+        raise Exception(f"Unknown storage: {name}. Available: {list(storages)}")
+    return storages[name]
+
+
+def _metadata(data: t.Data) -> dict:
+    return {
+        "uuid": data.uuid.id,
+        "uuids": {name: data.uuids[name].id for name in data.matrices},
+        "history": (
+            data.history.uuid if data.history is not None and len(data.history) else pickable_uuid(data.historystr)
+        ).id,
+        "failure": data.failure,
+        "frozen": data.isfrozen,
+        "hollow": data.ishollow,
+        "target": data.target,
+    }
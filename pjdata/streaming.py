@@ -0,0 +1,187 @@
+"""Lazy, bounded-memory consumption of Data streams (e.g. the 'stream' attribute of Data)."""
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Iterable, TYPE_CHECKING, Tuple, Optional, AsyncIterator, Any
+
+if TYPE_CHECKING:
+    import pjdata.types as t
+    import pjdata.transformer.transformer as tr
+
+_END = object()
+
+
+class _Failure:
+    """Exception raised by the producer, to be re-raised by the consumer."""
+
+    def __init__(self, exception: Exception):
+        self.exception = exception
+
+
+def transformed(stream: Iterable[t.Data], transformers: Iterable[tr.Transformer]) -> Iterator[t.Data]:
+    """Lazily apply a sequence of transformers to each Data object of a stream.
+
+    Only one Data object is processed at a time, i.e. memory usage does not depend on the stream length."""
+    transformers = list(transformers)
+    for data in stream:
+        for transformer in transformers:
+            data = transformer.transform(data)
+        yield data
+
+
+def prefetched(stream: Iterable[Any], size: int = 2) -> Iterator[Any]:
+    """Consume a stream in a background thread, keeping at most 'size' items ahead of the consumer.
+
+    The producer blocks when the queue is full (backpressure), so I/O or computation of the next items
+    overlaps with the processing of the current one in constant memory.
+    Exceptions raised by the producer are re-raised at the consumer side.
+    Stopping the iteration earlier also stops the producer."""
+    buffer, stop = _background(stream, size)
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+
+
+def batches(stream: Iterable[Any], size: int) -> Iterator[Tuple[Any, ...]]:
+    """Group the items of a stream into tuples of (at most) 'size' items.
+
+    Tuples of Data objects can be directly transformed, see Transformer.transform()."""
+    if size < 1:
+        raise Exception(f"Batch size should be at least 1! Not {size}!")
+    batch = []
+    for item in stream:
+        batch.append(item)
+        if len(batch) == size:
+            yield tuple(batch)
+            batch = []
+    if batch:
+        yield tuple(batch)
+
+
+def microbatches(
+        stream: Iterable[Any], size: int, max_delay: float, prefetch: Optional[int] = None
+) -> Iterator[Tuple[Any, ...]]:
+    """Group the items of a stream into tuples of at most 'size' items or
+    the items that arrived within 'max_delay' seconds since the first item of the tuple, whichever comes first.
+
+    Useful for slow/irregular sources (e.g. data streams), to avoid waiting indefinitely for a full batch.
+    The stream is consumed in background (see prefetched()) with a queue of 'prefetch' items (default: 'size')."""
+    if size < 1:
+        raise Exception(f"Batch size should be at least 1! Not {size}!")
+    buffer, stop = _background(stream, prefetch or size)
+    try:
+        finished = False
+        while not finished:
+            batch = []
+            deadline = None
+            while len(batch) < size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    item = buffer.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exception
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + max_delay
+            if batch:
+                yield tuple(batch)
+    finally:
+        stop.set()
+
+
+async def aiterate(stream: Iterable[Any], prefetch: int = 2) -> AsyncIterator[Any]:
+    """Async iterator version of prefetched().
+
+    The stream is consumed in a background thread, so the event loop is never blocked by slow producers."""
+    iterator = prefetched(stream, prefetch)
+    loop = asyncio.get_running_loop()
+    # A single worker runs next() and close() in order, so a cancelled task never closes a running generator.
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, next, iterator, _END)
+            if item is _END:
+                return
+            yield item
+    finally:
+        closing = executor.submit(iterator.close)
+        executor.shutdown(wait=False)
+        await asyncio.shield(asyncio.wrap_future(closing))
+
+
+def pipeline(
+        stream: Iterable[t.Data],
+        transformers: Iterable[tr.Transformer],
+        prefetch: Optional[int] = 2,
+        batch_size: Optional[int] = None,
+) -> Iterator[t.DataOrTup]:
+    """Lazily transform a stream of Data objects with bounded memory.
+
+    Parameters
+    ----------
+    stream
+        Iterator that generates Data objects, e.g. data.stream.
+    transformers
+        Sequence of transformers to apply to each Data object.
+    prefetch
+        Maximum number of input Data objects read ahead in background. None means no prefetching.
+    batch_size
+        If given, Data objects are grouped in tuples (applying transformers to the whole tuple).
+
+    Returns
+    -------
+    Iterator of transformed Data objects (or tuples of Data objects).
+    """
+    if prefetch:
+        stream = prefetched(stream, prefetch)
+    if batch_size:
+        stream = batches(stream, batch_size)
+    return transformed(stream, transformers)
+
+
+def _background(stream: Iterable[Any], size: int) -> Tuple[queue.Queue, threading.Event]:
+    """Start a daemon thread feeding a bounded queue from the stream; the event tells it to give up."""
+    if size < 1:
+        raise Exception(f"Prefetch size should be at least 1! Not {size}!")
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in stream:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_Failure(e))
+            return
+        put(_END)
+
+    threading.Thread(target=produce, daemon=True).start()
+    return buffer, stop
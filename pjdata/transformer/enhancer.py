@@ -17,6 +17,13 @@ class Enhancer(Transformer):
         self._uuid = component.cfuuid()
         super().__init__(component)
 
+    @classmethod
+    def _registry_key(cls, component, *args):
+        # Subclasses with their own constructor may keep more state than the component.
+        if cls.__init__ is not Enhancer.__init__ or isinstance(component, str):
+            return None
+        return cls, component.serialized, component.cfuuid().id
+
     @lru_cache()
     def info(self, data: t.Data) -> Info:
         info = self._info_impl(data)
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from inspect import signature
-from typing import Dict, Any, Callable
+from inspect import signature, CO_VARARGS, CO_VARKEYWORDS
+from threading import RLock
+from types import FunctionType
+from typing import Dict, Any
 
 from pjdata.mixin.printing import withPrinting
 
 
 class Info(withPrinting):
+    # Zero-arity function items (pending) and their results, outside __dict__ (i.e. outside jsonable).
+    # The lock serializes their evaluation; it is reentrant because an item may depend on another one.
+    __slots__ = ("_lazy", "_values", "_lock")
+
     def __init__(self, items: Dict[str, Any] = None, **kwargs):
         if items is None:
             items = kwargs
@@ -17,10 +22,11 @@ class Info(withPrinting):
         #  Memory management is already done by lru in each model individually,
         #  so keeping the references is not a burden.
 
-        # Convert zero-arity function items to cached properties.
-        lazies = {k: v for k, v in items.items() if callable(v) and not signature(v).parameters}
-        _ = [items.pop(k) for k in lazies]
-        self._add_lazy_attr(lazies)
+        # Zero-arity function items are evaluated at the first access, see __getattr__.
+        self._lazy = {k: v for k, v in items.items() if callable(v) and _nullary(v)}
+        self._values = {}
+        self._lock = RLock()
+        items = {k: v for k, v in items.items() if k not in self._lazy}
 
         self.__dict__.update(items)
 
@@ -32,23 +38,39 @@ class Info(withPrinting):
         else:
             self.transformers = []
 
-    def _add_lazy_attr(self, lazies: Dict[str, Callable[[], Any]]):
-        """Attach prop_fn to instance with name prop_name.
-        Assumes that prop_fn takes self as an argument.
-        Reference: https://stackoverflow.com/a/1355444/509706
-
-        Alert: Despite having the same class name and all being descendants of the original Info,
-        the instances patched by this method will have different classes!
-        E.g.
-            isinstance(a, Info) -> True
-            isinstance(b, Info) -> True
-            but
-            isinstance(a, type(b)) -> False
-        """
-        klass = self.__class__
-        lazy_props = {k: property(lru_cache(f)) for k, f in lazies.items()}
-        child_class = type(klass.__name__, (klass,), lazy_props)
-        self.__class__ = child_class
+    def __getattr__(self, item):
+        """Value of a lazy item, calculated only once (only called when the usual attribute lookup fails)."""
+        if item in self.__slots__:  # E.g. before __init__, while unpickling.
+            raise AttributeError(item)
+        values = self._values
+        if item not in values:
+            if item not in self._lazy:
+                raise AttributeError(f"'{type(self).__name__}' object has no attribute '{item}'")
+            with self._lock:
+                if item not in values:  # Another thread may have been faster.
+                    values[item] = self._lazy[item]()  # Kept pending if it raises.
+                    del self._lazy[item]
+        return values[item]
+
+    def __getstate__(self):
+        return self.__dict__, {"_lazy": self._lazy, "_values": self._values}
+
+    def __setstate__(self, state):
+        dic, slots = state
+        self.__dict__.update(dic)
+        self._lazy, self._values = slots["_lazy"], slots["_values"]
+        self._lock = RLock()
 
     def _jsonable_impl(self):
         return self.__dict__
+
+
+def _nullary(f) -> bool:
+    """Whether a callable takes no parameters. Faster than inspect.signature() for plain functions (e.g. lambdas)."""
+    if type(f) is FunctionType:
+        code = f.__code__
+        return not (code.co_argcount or code.co_kwonlyargcount or code.co_flags & (CO_VARARGS | CO_VARKEYWORDS))
+    try:
+        return not signature(f).parameters
+    except (TypeError, ValueError):  # E.g. some builtins.
+        return False
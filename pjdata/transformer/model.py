@@ -5,6 +5,7 @@ from functools import lru_cache
 from typing import Any, TYPE_CHECKING, Union, Dict
 
 from pjdata.aux.util import Property
+from pjdata.config import CACHE_CONFIG
 from pjdata.mixin.serialization import withSerialization
 from pjdata.transformer.info import Info
 from pjdata.transformer.transformer import Transformer
@@ -25,8 +26,17 @@ class Model(Transformer):
     @Property
     @lru_cache()
     def info(self) -> Info:
+        """Fitted model information, reloaded from CACHE_CONFIG["models"] (if set) instead of refitting."""
+        cache = CACHE_CONFIG["models"]
+        if cache is not None:
+            info = cache.get(self.uuid.id)
+            if info is not None:
+                return info
         info = self._info_impl(self.data)
-        return info if isinstance(info, Info) else Info(items=info)
+        info = info if isinstance(info, Info) else Info(items=info)
+        if cache is not None:
+            cache.set(self.uuid.id, info)
+        return info
 
     @abstractmethod
     def _info_impl(self, train):
@@ -22,6 +22,12 @@ class PHolder(tr.Transformer):  # TODO: Find a better name? Skiper?
         self._uuid = u.UUID.identity
         super().__init__(component)
 
+    @classmethod
+    def _registry_key(cls, component, *args):
+        if cls.__init__ is not PHolder.__init__:
+            return None
+        return cls, component if isinstance(component, str) else component.serialized
+
     def _transform_impl(self, data: t.Data) -> t.Result:
         return {}
 
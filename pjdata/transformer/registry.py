@@ -0,0 +1,71 @@
+"""Flyweight registry of transformers: identical (class, serialized component, uuid) share a single instance."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, TYPE_CHECKING
+
+from pjdata.config import threadLock
+
+if TYPE_CHECKING:
+    import pjdata.transformer.transformer as tr
+
+
+class Registry:
+    """Bounded (LRU) mapping from construction keys to transformer instances.
+
+    Enhancers and placeholders keep only serialized information about their components, so an instance can be
+    safely shared by all equivalent constructions (e.g. the same component applied to many folds/candidates).
+    Models are not registered: they keep their training Data, which the registry must not keep alive.
+
+    Parameters
+    ----------
+    maxsize
+        Maximum number of kept transformers. The least recently requested ones are discarded first.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.enabled = True
+        self._instances: OrderedDict = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable, create: Callable[[], tr.Transformer]) -> tr.Transformer:
+        """Shared instance for the given key, created only at the first request."""
+        with threadLock:
+            transformer = self._instances.get(key)
+            if transformer is not None:
+                self._instances.move_to_end(key)
+                self.hits += 1
+                return transformer
+            self.misses += 1
+        transformer = create()  # Outside the lock: construction may create other transformers.
+        with threadLock:
+            # Another thread may have been faster.
+            transformer = self._instances.setdefault(key, transformer)
+            while len(self._instances) > self.maxsize:
+                self._instances.popitem(last=False)
+                self.evictions += 1
+        return transformer
+
+    def clear(self):
+        with threadLock:
+            self._instances.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, float]:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._instances),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / requests if requests else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._instances)
+
+
+# Process-wide registry used by Transformer construction, see transformer.Flyweight.
+registry = Registry()
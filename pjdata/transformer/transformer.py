@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import json
-from abc import ABC, abstractmethod
-from functools import lru_cache
+from abc import ABC, ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache, partial
 
+import pjdata.aux.instrumentation as instrumentation
 import pjdata.mixin.serialization as ser
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal, Optional
 
 from pjdata.aux.util import Property
 
@@ -15,9 +17,20 @@ if TYPE_CHECKING:
 from pjdata.aux.serialization import serialize, deserialize
 from pjdata.aux.uuid import UUID
 from pjdata.mixin.printing import withPrinting
+from pjdata.transformer.registry import registry
 
 
-class Transformer(ser.withSerialization, withPrinting, ABC):
+class Flyweight(ABCMeta):
+    """Metaclass that returns shared instances for equivalent constructions, see pjdata.transformer.registry."""
+
+    def __call__(cls, *args, **kwargs):
+        key = cls._registry_key(*args) if registry.enabled and not kwargs else None
+        if key is None:
+            return super().__call__(*args, **kwargs)
+        return registry.get(key, partial(super().__call__, *args))
+
+
+class Transformer(ser.withSerialization, withPrinting, ABC, metaclass=Flyweight):
     ispholder = False
 
     def __init__(self, component: t.Union[str, ser.withSerialization]):
@@ -55,6 +68,11 @@ class Transformer(ser.withSerialization, withPrinting, ABC):
             "uuid": self.uuid,
         }
 
+    @classmethod
+    def _registry_key(cls, component, *args):
+        """Key identifying equivalent constructions (class, serialized component, uuid), None means 'do not share'."""
+        return None
+
     @Property
     @lru_cache()
     def component(self):
@@ -70,7 +88,8 @@ class Transformer(ser.withSerialization, withPrinting, ABC):
     def pholder(self) -> ph.PHolder:
         from pjdata.transformer.pholder import PHolder
 
-        return PHolder(self.component)
+        # The placeholder needs only serialized information, so the component is not instantiated.
+        return PHolder(deserialize(self.serialized_component, lazy=True))
 
     @classmethod
     def materialize(cls, serialized):
@@ -92,12 +111,77 @@ class Transformer(ser.withSerialization, withPrinting, ABC):
         component = FakeComponent()
         return cls(component)
 
-    def transform(self, content: t.DataOrTup, exit_on_error=True) -> t.DataOrTup:
-        if isinstance(content, tuple):
-            return tuple((dt.transformedby(self) for dt in content))
-        # Todo: We should add exception handling here because self.func can raise errors
-        # print(' transform... by', self.name)
-        return content.transformedby(self)
+    def transform(
+            self,
+            content: t.DataOrTup,
+            exit_on_error=True,
+            backend: Literal["sequential", "thread", "process"] = "sequential",
+            n_jobs: Optional[int] = None,
+    ) -> t.DataOrTup:
+        """Transform a Data object or a tuple of Data objects (e.g. CV folds).
+
+        Parameters
+        ----------
+        content
+            Data object or tuple of Data objects.
+        exit_on_error
+            Whether to raise exceptions from the transformation or to convert them to a failed Data object.
+        backend
+            How to process the elements of a tuple: 'sequential', 'thread' (pool) or 'process' (pool).
+            Output order is preserved. The process pool needs pickable transformers and Data objects.
+        n_jobs
+            Number of workers for the pool. None means the executor default.
+
+        Returns
+        -------
+        Data object or tuple of Data objects, according to the input.
+        """
+        if instrumentation.recorder is not None:
+            return instrumentation.recorder.measure(
+                "transform", self, content, self._transform, content, exit_on_error, backend, n_jobs
+            )
+        return self._transform(content, exit_on_error, backend, n_jobs)
+
+    def _transform(self, content: t.DataOrTup, exit_on_error, backend, n_jobs) -> t.DataOrTup:
+        if not isinstance(content, tuple):
+            return self._safe_transformedby(content, exit_on_error)
+        if backend == "sequential" or len(content) < 2:
+            return tuple(self._safe_transformedby(dt, exit_on_error) for dt in content)
+
+        if backend == "thread":
+            executor = ThreadPoolExecutor
+        elif backend == "process":
+            executor = ProcessPoolExecutor
+        else:
+            raise Exception(f"Unknown backend: {backend}. Options: sequential, thread, process.")
+        with executor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_transformedby, self, dt) for dt in content]
+            # History does not cross process boundaries (see Data.__reduce_ex__), so it is rebuilt here.
+            rebuild = backend == "process"
+            return tuple(self._result(future, dt, exit_on_error, rebuild) for future, dt in zip(futures, content))
+
+    def _safe_transformedby(self, data: t.Data, exit_on_error: bool) -> t.Data:
+        try:
+            return data.transformedby(self)
+        except Exception as e:
+            if exit_on_error:
+                raise
+            return self._failed(data, e)
+
+    def _result(self, future, data: t.Data, exit_on_error: bool, rebuild_history: bool) -> t.Data:
+        try:
+            result = future.result()
+        except Exception as e:
+            if exit_on_error:
+                raise
+            return self._failed(data, e)
+        if rebuild_history and result is not data:
+            result.history = data.history << [self.pholder if data.isfrozen or data.failure else self]
+        return result
+
+    def _failed(self, data: t.Data, exception: Exception) -> t.Data:
+        """Data object marked as failed by this transformer (UUID algebra is kept)."""
+        return data.updated([self], failure=f"{type(exception).__name__}: {exception}")
 
     @abstractmethod
     def _transform_impl(self, data: t.Data) -> t.Result:
@@ -111,3 +195,8 @@ class Transformer(ser.withSerialization, withPrinting, ABC):
 
     def _cfuuid_impl(self, data=None):
         raise Exception("Non sense access!")
+
+
+def _transformedby(transformer: Transformer, data: t.Data) -> t.Data:
+    """Module-level helper, so that it can be sent to a process pool."""
+    return data.transformedby(transformer)